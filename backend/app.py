@@ -1,5 +1,9 @@
+import time
+# Start of the startup timing breakdown (import, weight load, warm-up)
+STARTUP_STARTED = time.time()
+
 import os
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, BackgroundTasks, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
@@ -19,7 +23,24 @@ from io import BytesIO
 from PIL import Image
 import asyncio
 import threading
-import time
+from inference import InferenceExecutor
+from batching import MicroBatcher
+from cache import ResultCache
+from jobs import JobManager, JobCancelled
+from video import VideoPipeline, FrameSampler
+from tracking import IoUTracker
+from streaming import EventStream, STREAM_FORMATS
+from streams import StreamSessionManager
+from archive import ARCHIVE_FORMATS, iter_archive
+from registry import ModelRegistry
+from backends import BACKENDS, check_imgsz, create_backend, split_model_name, torch_memory_bytes
+from quantization import QUANTIZATION_MODES
+from tiling import TiledInference
+from roi import RegionOfInterest, parse_roi
+from postprocess import (select_class_ids, format_detections, draw_detections,
+                         ARTIFACT_MODES, save_artifacts)
+
+IMPORT_SECONDS = time.time() - STARTUP_STARTED
 
 app = FastAPI(title="YOLO Detection API", version="1.0.0")
 
@@ -63,19 +84,42 @@ COCO_CLASSES = [
     'hair drier', 'toothbrush'
 ]
 
+# Input frame sizes (WIDTHxHEIGHT) each newly loaded model runs dummy inferences at
+WARMUP_SIZES = [tuple(int(v) for v in size.lower().split("x"))
+                for size in os.getenv("WARMUP_SIZES", "640x640").split(",") if size.strip()]
+WARMUP_RUNS = int(os.getenv("WARMUP_RUNS", 1))
+
+# Detection results for repeated images, keyed per loaded model instance
+result_cache = ResultCache()
+
 class YOLODetector:
-    def __init__(self, model_name="yolov8n.pt", conf_threshold=0.5, iou_threshold=0.45):
+    def __init__(self, model_name="yolov8n.pt", conf_threshold=0.5, iou_threshold=0.45, class_names=None,
+                 backend="torch"):
         self.model_name = model_name
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
         self.model = None
-        self.class_names = COCO_CLASSES
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.class_names = class_names if class_names else COCO_CLASSES
+        # Inference size used when a request does not ask for one
+        self.imgsz = check_imgsz(os.getenv("DEFAULT_IMGSZ", 640))
+        # torch runs the ultralytics model directly; onnx/openvino run a cached CPU export of it
+        self.backend = backend
+        self.runtime = None
+        self.device = "cuda" if torch.cuda.is_available() and backend == "torch" else "cpu"
+        # The ultralytics predictor is not thread-safe, so forward passes are serialized
+        self.inference_lock = threading.Lock()
+        # Distinguishes cache entries of this instance from any previously loaded model
+        self.instance_id = uuid.uuid4().hex
+        self.warmup_seconds = None
+        self.load_seconds = None
         self.load_model()
+        # Concurrent detect() calls are coalesced into batched forward passes
+        self.batcher = MicroBatcher(self.infer_batch, name=f"batcher-{os.path.basename(str(model_name))}")
 
     def load_model(self):
         try:
             print(f"Loading YOLO model: {self.model_name}")
+            start = time.time()
 
             # Check if model file exists locally
             if os.path.exists(self.model_name):
@@ -90,79 +134,325 @@ class YOLODetector:
             self.model.conf = self.conf_threshold
             self.model.iou = self.iou_threshold
 
-            print(f"Model loaded successfully on {self.device}")
+            # Export (once) and open the selected inference backend
+            self.runtime = create_backend(self.backend, self.model, self.model.ckpt_path or self.model_name,
+                                          self.imgsz)
+
+            self.load_seconds = time.time() - start
+            print(f"Model loaded successfully on {self.device} ({self.backend}) in {self.load_seconds:.2f}s")
             print(f"Available classes: {len(self.class_names)}")
 
         except Exception as e:
             print(f"Error loading model: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to load model: {str(e)}")
 
-    def detect(self, image, selected_classes=None):
+    def infer_batch(self, images, key=None):
+        """Run one forward pass over a list of images and return (xyxy, conf, cls) arrays per image
+
+        key is the (conf, iou, class_ids, imgsz) tuple for the batch; they are handed
+        to the backend so NMS drops low-confidence and unwanted classes itself.
+        """
+        conf, iou, class_ids, imgsz = key if key is not None else self.inference_key()
+        with self.inference_lock:
+            return self.runtime.predict(images, conf, iou, class_ids, imgsz)
+
+    def warmup(self, sizes=None, runs=None):
+        """Dummy forward passes so the first real request does not pay for lazy initialization
+
+        Every input shape gets its own pass, since letterboxed shapes differ
+        per aspect ratio and kernels are selected per shape.
+        """
+        start = time.time()
+        for width, height in sizes or WARMUP_SIZES:
+            image = np.zeros((height, width, 3), dtype=np.uint8)
+            for _ in range(runs or WARMUP_RUNS):
+                self.infer_batch([image])
+        self.warmup_seconds = time.time() - start
+        print(f"Warmed up {self.model_name} in {self.warmup_seconds:.2f}s")
+        return self.warmup_seconds
+
+    def close(self):
+        self.batcher.close()
+        # Results of an unloaded or replaced model can never be served again
+        result_cache.clear(self.instance_id)
+
+    def memory_bytes(self):
+        """Bytes held by the network's parameters and buffers, plus any exported runtime model"""
+        if self.model is None:
+            return 0
+        total = torch_memory_bytes(self.model)
+        if self.backend != "torch":
+            total += self.runtime.memory_bytes()
+        return total
+
+    def inference_key(self, selected_classes=None, conf_threshold=None, iou_threshold=None, imgsz=None):
+        """Request-scoped thresholds, class filter and input size; the model defaults are never mutated
+
+        Only requests with the same key share a batch, so every image in a
+        forward pass is letterboxed to the same size.
+        """
+        class_ids = select_class_ids(self.class_names, selected_classes)
+        return (
+            self.conf_threshold if conf_threshold is None else float(conf_threshold),
+            self.iou_threshold if iou_threshold is None else float(iou_threshold),
+            tuple(class_ids.tolist()) if class_ids is not None else None,
+            check_imgsz(imgsz) or self.imgsz
+        )
+
+    def lookup(self, image, selected_classes=None, conf_threshold=None, iou_threshold=None, use_cache=False,
+               imgsz=None):
+        """(inference key, cache key, cached (detections, yolo_labels) or None) for one image"""
+        key = self.inference_key(selected_classes, conf_threshold, iou_threshold, imgsz)
+
+        # Identical pixels with identical parameters reuse the previous result
+        cache_key = None
+        cached = None
+        if use_cache and result_cache.enabled:
+            cache_key = result_cache.make_key(image, (self.model_name, self.instance_id), key)
+            cached = result_cache.get(cache_key)
+        return key, cache_key, cached
+
+    def finish(self, image, arrays=None, cache_key=None, cached=None, annotate=True):
+        """(detections, annotated image, yolo_labels) from one image's (xyxy, conf, cls) or its cached result"""
+        if cached is not None:
+            detections, yolo_labels = cached
+        else:
+            # Format all boxes together (NMS already filtered classes)
+            xyxy, conf, cls = arrays
+            img_height, img_width = image.shape[:2]
+            detections, yolo_labels = format_detections(xyxy, conf, cls, self.class_names, img_width, img_height)
+            if cache_key is not None:
+                result_cache.put(cache_key, (detections, yolo_labels))
+
+        # Draw bounding boxes and labels (skipped, along with the image copy, when not needed)
+        annotated_image = draw_detections(image, detections) if annotate else None
+        return detections, annotated_image, yolo_labels
+
+    def detect(self, image, selected_classes=None, conf_threshold=None, iou_threshold=None, annotate=True,
+               use_cache=False, imgsz=None):
         if self.model is None:
             raise HTTPException(status_code=500, detail="Model not loaded")
 
         try:
-            # Perform inference
-            results = self.model(image, verbose=False)
+            key, cache_key, cached = self.lookup(image, selected_classes, conf_threshold, iou_threshold,
+                                                 use_cache, imgsz)
+            # Perform inference (batched with concurrent requests using the same parameters)
+            arrays = self.batcher.submit(image, key) if cached is None else None
+            return self.finish(image, arrays, cache_key, cached, annotate)
 
-            # Process results
-            detections = []
-            annotated_image = image.copy()
-            yolo_labels = []  # For YOLO format labels
+        except Exception as e:
+            print(f"Detection error: {e}")
+            raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+
+    async def detect_async(self, image, selected_classes=None, conf_threshold=None, iou_threshold=None,
+                           annotate=True, use_cache=False, imgsz=None):
+        """detect() for request handlers: the wait for a batch is awaited on the event loop
+
+        Only hashing, formatting and drawing run on the inference pool, so
+        concurrent requests can fill a batch however few workers there are.
+        """
+        if self.model is None:
+            raise HTTPException(status_code=500, detail="Model not loaded")
+
+        try:
+            key, cache_key, cached = await inference_executor.submit(
+                self.lookup, image, selected_classes, conf_threshold, iou_threshold, use_cache, imgsz)
+            arrays = None
+            if cached is None:
+                future = self.batcher.enqueue(image, key)
+                if future is not None:
+                    arrays = await asyncio.wrap_future(future)
+                else:
+                    # Batching is off (or the model is being unloaded): run the forward pass on the pool
+                    arrays = await inference_executor.submit(self.batcher.submit, image, key)
+            return await inference_executor.submit(self.finish, image, arrays, cache_key, cached, annotate)
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Detection error: {e}")
+            raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+
+    def detect_tiled(self, image, tile_size=640, tile_overlap=0.2, selected_classes=None, conf_threshold=None,
+                     iou_threshold=None, annotate=True, imgsz=None):
+        """detect() for images much larger than the model input, on overlapping full-resolution tiles
+
+        Tiles run through the batcher one model batch at a time and their boxes
+        are merged with cross-tile NMS; returns the tiling stats as a fourth value.
+        """
+        if self.model is None:
+            raise HTTPException(status_code=500, detail="Model not loaded")
+
+        try:
+            # Tiles are inferred at their own size, the whole-image pass at the request's size
+            tile_key = self.inference_key(selected_classes, conf_threshold, iou_threshold, tile_size)
+            full_key = self.inference_key(selected_classes, conf_threshold, iou_threshold, imgsz)
+            tiler = TiledInference(tile_size, tile_overlap, max_batch=self.batcher.max_batch_size)
+            xyxy, conf, cls = tiler.run(
+                image,
+                lambda tiles: self.batcher.submit_many(tiles, tile_key),
+                lambda images: self.batcher.submit_many(images, full_key)
+            )
 
-            # Get image dimensions for YOLO format
             img_height, img_width = image.shape[:2]
+            detections, yolo_labels = format_detections(xyxy, conf, cls, self.class_names, img_width, img_height)
+            annotated_image = draw_detections(image, detections) if annotate else None
+            return detections, annotated_image, yolo_labels, tiler.stats()
+
+        except Exception as e:
+            print(f"Detection error: {e}")
+            raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+
+    def detect_many(self, images, selected_classes=None, conf_threshold=None, iou_threshold=None,
+                    use_cache=False, imgsz=None):
+        """(detections, yolo_labels) for several images, batched into shared forward passes"""
+        if self.model is None:
+            raise HTTPException(status_code=500, detail="Model not loaded")
 
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for i in range(len(boxes)):
-                        # Extract detection data
-                        x1, y1, x2, y2 = boxes.xyxy[i].cpu().numpy() if boxes.xyxy[i].is_cuda else boxes.xyxy[i].numpy()
-                        conf = boxes.conf[i].cpu().item() if boxes.conf[i].is_cuda else boxes.conf[i].item()
-                        cls = int(boxes.cls[i].cpu().item() if boxes.cls[i].is_cuda else boxes.cls[i].item())
-
-                        # Get class name
-                        class_name = self.class_names[cls] if cls < len(self.class_names) else f"class_{cls}"
-
-                        # Filter by selected classes if specified
-                        if selected_classes and class_name not in selected_classes:
-                            continue
-
-                        # Add detection to list
-                        detection = {
-                            "class": class_name,
-                            "confidence": float(conf),
-                            "bbox": [float(x1), float(y1), float(x2), float(y2)]
-                        }
-                        detections.append(detection)
-
-                        # Create YOLO format label (class_id x_center y_center width height)
-                        x_center = ((x1 + x2) / 2) / img_width
-                        y_center = ((y1 + y2) / 2) / img_height
-                        width = (x2 - x1) / img_width
-                        height = (y2 - y1) / img_height
-                        yolo_labels.append(f"{cls} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}")
-
-                        # Draw bounding box and label
-                        cv2.rectangle(annotated_image, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-
-                        # Draw label
-                        label = f"{class_name}: {conf:.2f}"
-                        text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
-                        cv2.rectangle(annotated_image, (int(x1), int(y1) - text_size[1] - 10),
-                                    (int(x1) + text_size[0], int(y1)), (0, 255, 0), -1)
-                        cv2.putText(annotated_image, label, (int(x1), int(y1) - 5),
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
-
-            return detections, annotated_image, yolo_labels
+        try:
+            key = self.inference_key(selected_classes, conf_threshold, iou_threshold, imgsz)
+            outputs = [None] * len(images)
+            cache_keys = [None] * len(images)
+            if use_cache and result_cache.enabled:
+                for i, image in enumerate(images):
+                    cache_keys[i] = result_cache.make_key(image, (self.model_name, self.instance_id), key)
+                    outputs[i] = result_cache.get(cache_keys[i])
+
+            # Only cache misses go to the model, together so they can share a batch
+            pending = [i for i, output in enumerate(outputs) if output is None]
+            results = self.batcher.submit_many([images[i] for i in pending], key) if pending else []
+            for i, (xyxy, conf, cls) in zip(pending, results):
+                img_height, img_width = images[i].shape[:2]
+                outputs[i] = format_detections(xyxy, conf, cls, self.class_names, img_width, img_height)
+                if cache_keys[i] is not None:
+                    result_cache.put(cache_keys[i], outputs[i])
+            return outputs
 
         except Exception as e:
             print(f"Detection error: {e}")
             raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
 
-# Initialize detector
-detector = YOLODetector()
+def load_detector(model_name, conf_threshold=0.5, iou_threshold=0.45, warmup=True):
+    """Build a detector for a model name, using models/<name> with its classes file when present
+
+    A "@backend" suffix (e.g. yolov8n.pt@onnx) picks the inference backend for that model.
+    """
+    try:
+        model_name, backend = split_model_name(model_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    model_path = os.path.join("models", model_name)
+    classes_path = os.path.join("models", os.path.splitext(model_name)[0] + ".txt")
+    if os.path.exists(model_path) and os.path.exists(classes_path):
+        # Load custom classes
+        with open(classes_path, "r") as f:
+            custom_classes = [line.strip() for line in f if line.strip()]
+        detector = YOLODetector(model_path, conf_threshold, iou_threshold, class_names=custom_classes,
+                                backend=backend)
+    else:
+        # Use predefined model and COCO classes
+        detector = YOLODetector(model_name, conf_threshold, iou_threshold, backend=backend)
+    # Models only become visible to requests once they are warm
+    if warmup:
+        detector.warmup()
+    return detector
+
+# Loaded models, shared by all requests; each request may name the one it wants
+model_registry = ModelRegistry(load_detector, os.getenv("DEFAULT_MODEL", "yolov8n.pt"))
+
+# Readiness flips only once the default model is loaded and warmed up
+startup_state = {"status": "starting", "ready": False, "timings": {"import_seconds": round(IMPORT_SECONDS, 3)}}
+
+# Worker pool for all blocking detection, decode/encode and file work
+inference_executor = InferenceExecutor()
+
+# Background jobs for long-running video processing
+video_jobs = JobManager()
+
+# /predict_stream readers hold a thread for as long as the stream is read (until the client leaves
+# when streaming), so they get their own pool and never tie up the inference workers
+stream_readers = InferenceExecutor(max_workers=int(os.getenv("STREAM_READERS", 4)), max_queue=0)
+
+# Model loads run one at a time on their own worker, never on the inference pool
+model_jobs = JobManager(max_workers=1, max_pending=2)
+
+def detect_stream_frames(frames, detect_options, model_name=None):
+    # Looks up the model per batch so sessions on the default model follow model swaps
+    detector = model_registry.get(model_name)
+    return [detections for detections, _ in detector.detect_many(frames, **detect_options)]
+
+# Live streams kept open between requests, sharing scheduled and batched detection
+stream_sessions = StreamSessionManager(detect_stream_frames)
+
+# Uploads up to this size are decoded straight from memory instead of via uploads/
+IN_MEMORY_UPLOAD_MAX_BYTES = int(os.getenv("IN_MEMORY_UPLOAD_MAX_MB", 20)) * 1024 * 1024
+
+# Frames a WebSocket client may have waiting; older ones are dropped beyond this
+WS_MAX_PENDING_FRAMES = int(os.getenv("WS_MAX_PENDING_FRAMES", 1))
+
+def save_upload(upload, path):
+    with open(path, "wb") as buffer:
+        shutil.copyfileobj(upload.file, buffer)
+
+def upload_size(upload):
+    upload.file.seek(0, os.SEEK_END)
+    size = upload.file.tell()
+    upload.file.seek(0)
+    return size
+
+def decode_upload_image(upload, spool_path):
+    """Decode an uploaded image from its bytes, spooling to disk only for large uploads"""
+    if upload_size(upload) <= IN_MEMORY_UPLOAD_MAX_BYTES:
+        data = upload.file.read()
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    save_upload(upload, spool_path)
+    try:
+        return cv2.imread(spool_path)
+    finally:
+        os.remove(spool_path)
+
+async def resolve_detector(model_name=None):
+    """Detector for a request's model (the default when None), loading it on the worker pool if needed"""
+    detector = model_registry.peek(model_name)
+    if detector is None:
+        detector = await inference_executor.submit(model_registry.get, model_name)
+    return detector
+
+def warm_start():
+    """Load and warm the default model, recording the startup timing breakdown"""
+    detector = model_registry.get()
+    timings = startup_state["timings"]
+    timings["weight_load_seconds"] = round(detector.load_seconds or 0.0, 3)
+    timings["warmup_seconds"] = round(detector.warmup_seconds or 0.0, 3)
+    timings["warmup_sizes"] = [f"{w}x{h}" for w, h in WARMUP_SIZES]
+    timings["total_seconds"] = round(time.time() - STARTUP_STARTED, 3)
+    print(f"Startup: import {timings['import_seconds']}s, weight load {timings['weight_load_seconds']}s, "
+          f"warm-up {timings['warmup_seconds']}s, total {timings['total_seconds']}s")
+
+@app.on_event("startup")
+async def start_warmup():
+    # The server accepts connections (and /health answers) while the model warms up
+    async def warm():
+        try:
+            await inference_executor.submit(warm_start)
+            startup_state["status"] = "ready"
+            startup_state["ready"] = True
+        except Exception as e:
+            print(f"Startup warm-up failed: {e}")
+            startup_state["status"] = "error"
+            startup_state["error"] = getattr(e, "detail", str(e))
+
+    startup_state["task"] = asyncio.ensure_future(warm())
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    stream_sessions.shutdown()
+    video_jobs.shutdown()
+    model_jobs.shutdown()
+    inference_executor.shutdown(wait=False)
+    stream_readers.shutdown(wait=False)
+    model_registry.close()
 
 @app.get("/")
 async def root():
@@ -170,14 +460,37 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    detector = model_registry.peek()
     return {
         "status": "healthy",
-        "model_loaded": detector.model is not None,
-        "device": detector.device,
-        "model_name": detector.model_name,
+        "ready": startup_state["ready"],
+        "startup": startup_state["timings"],
+        "model_loaded": detector is not None and detector.model is not None,
+        "device": detector.device if detector else None,
+        "model_name": detector.model_name if detector else None,
+        "models": model_registry.stats(),
+        "inference": inference_executor.stats(),
+        "batching": detector.batcher.stats() if detector else None,
+        "cache": result_cache.stats(),
+        "jobs": video_jobs.stats(),
+        "streams": stream_sessions.stats(),
+        "stream_readers": stream_readers.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """200 once the default model is loaded and warmed up, 503 until then"""
+    content = {
+        "ready": startup_state["ready"],
+        "status": startup_state["status"],
+        "startup": startup_state["timings"],
+        "timestamp": datetime.now().isoformat()
+    }
+    if "error" in startup_state:
+        content["error"] = startup_state["error"]
+    return JSONResponse(status_code=200 if startup_state["ready"] else 503, content=content)
+
 @app.get("/classes")
 async def get_classes():
     return {
@@ -185,36 +498,146 @@ async def get_classes():
         "total": len(COCO_CLASSES)
     }
 
+def parse_artifacts(artifacts):
+    if artifacts not in ARTIFACT_MODES:
+        raise HTTPException(status_code=400, detail=f"artifacts must be one of: {', '.join(ARTIFACT_MODES)}")
+    return artifacts
+
+def parse_selected_classes(selected_classes):
+    """Class names from a JSON array or a comma-separated list, or None when empty"""
+    if not selected_classes:
+        return None
+    try:
+        classes_list = json.loads(selected_classes)
+    except ValueError:
+        classes_list = None
+    if not isinstance(classes_list, list):
+        classes_list = [cls.strip() for cls in selected_classes.split(',') if cls.strip()]
+    return classes_list or None
+
+def parse_imgsz(imgsz):
+    """Requested inference size (rounded up to the model stride), or None for the model default"""
+    try:
+        return check_imgsz(imgsz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def parse_roi_form(roi):
+    """Region of interest from a JSON polygon (or list of polygons) form field, or None"""
+    try:
+        polygons = parse_roi(roi)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid roi: {str(e)}")
+    return RegionOfInterest(polygons) if polygons else None
+
+def check_roi(roi, shape):
+    """Reject (400) a region of interest that does not overlap frames of this shape"""
+    if roi is None:
+        return
+    try:
+        roi.check(shape)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid roi: {str(e)}")
+
+def detect_in_roi(detector, frame, roi, detect_options):
+    """Detections for a frame, inferring only on the ROI's bounding box when a region of interest is set"""
+    if roi is None:
+        return detector.detect(frame, annotate=False, **detect_options)[0]
+    # The crop geometry is validated here too, since a stream's frame size can change mid-way
+    check_roi(roi, frame.shape)
+    detections = detector.detect(roi.crop(frame), annotate=False, **detect_options)[0]
+    return roi.restore(detections, frame.shape)
+
+def parse_stream_format(stream):
+    if stream != "none" and stream not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"stream must be one of: none, {', '.join(STREAM_FORMATS)}")
+    return stream
+
+def load_prediction_image(file, file_id, input_path):
+    # Update status
+    processing_status[file_id] = {"status": "processing", "progress": 40, "message": "Loading image..."}
+
+    # Decode uploaded image (input_path is only used for oversized uploads)
+    image = decode_upload_image(file, input_path)
+    if image is None:
+        raise HTTPException(status_code=400, detail="Invalid image file")
+
+    # Update status
+    processing_status[file_id] = {"status": "processing", "progress": 60, "message": "Running YOLO detection..."}
+    return image
+
+def save_prediction(file_id, artifacts, image, annotated_image, yolo_labels, output_path, labels_path):
+    # Update status
+    processing_status[file_id] = {"status": "processing", "progress": 80, "message": "Saving results..."}
+
+    # Save annotated image and/or YOLO format labels
+    return save_artifacts(artifacts, image, annotated_image, yolo_labels, output_path, labels_path)
+
+async def run_image_prediction(detector, file, file_id, input_path, output_path, labels_path, detect_options,
+                               artifacts="all", tile_options=None):
+    """Decode, detect and save one upload; blocking steps run on the inference pool"""
+    image = await inference_executor.submit(load_prediction_image, file, file_id, input_path)
+
+    # Perform detection
+    write_image, _ = ARTIFACT_MODES[artifacts]
+    tiling = None
+    if tile_options:
+        detections, annotated_image, yolo_labels, tiling = await inference_executor.submit(
+            detector.detect_tiled, image, annotate=write_image, **tile_options, **detect_options)
+    else:
+        # Waiting for a shared batch does not hold a pool worker
+        detections, annotated_image, yolo_labels = await detector.detect_async(
+            image, annotate=write_image, use_cache=True, **detect_options)
+
+    saved = await inference_executor.submit(save_prediction, file_id, artifacts, image, annotated_image,
+                                            yolo_labels, output_path, labels_path)
+
+    # Get image dimensions
+    height, width = image.shape[:2]
+
+    return detections, width, height, saved, tiling
+
 @app.post("/predict")
 async def predict(
     file: UploadFile = File(...),
     conf_threshold: float = Form(0.5),
     iou_threshold: float = Form(0.45),
-    selected_classes: Optional[str] = Form(None)
+    selected_classes: Optional[str] = Form(None),
+    artifacts: str = Form("all"),
+    model_name: Optional[str] = Form(None),
+    imgsz: Optional[int] = Form(None),
+    tiled: bool = Form(False),
+    tile_size: int = Form(640),
+    tile_overlap: float = Form(0.2)
 ):
     # Validate file type
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image")
+    parse_artifacts(artifacts)
+    imgsz = parse_imgsz(imgsz)
+    tile_options = None
+    if tiled:
+        # Large images are sliced into overlapping tiles instead of being downscaled to imgsz
+        if not 0 <= tile_overlap < 1:
+            raise HTTPException(status_code=400, detail="tile_overlap must be between 0 and 1")
+        tile_options = {"tile_size": parse_imgsz(tile_size), "tile_overlap": tile_overlap}
+    detector = await resolve_detector(model_name)
 
     try:
         # Update processing status
         file_id = str(uuid.uuid4())
         processing_status[file_id] = {"status": "processing", "progress": 0, "message": "Starting detection..."}
 
-        # Update detector thresholds
-        detector.conf_threshold = conf_threshold
-        detector.iou_threshold = iou_threshold
-        if detector.model:
-            detector.model.conf = conf_threshold
-            detector.model.iou = iou_threshold
-
         # Parse selected classes
-        classes_list = None
-        if selected_classes:
-            try:
-                classes_list = json.loads(selected_classes)
-            except:
-                classes_list = [cls.strip() for cls in selected_classes.split(',') if cls.strip()]
+        classes_list = parse_selected_classes(selected_classes)
+
+        # Request-scoped inference parameters, passed into the predictor per call
+        detect_options = {
+            "selected_classes": classes_list,
+            "conf_threshold": conf_threshold,
+            "iou_threshold": iou_threshold,
+            "imgsz": imgsz or detector.imgsz
+        }
 
         # Generate unique filename
         file_extension = os.path.splitext(file.filename)[1]
@@ -226,42 +649,10 @@ async def predict(
         output_path = os.path.join("outputs", output_filename)
         labels_path = os.path.join("labels", labels_filename)
 
-        # Update status
-        processing_status[file_id] = {"status": "processing", "progress": 20, "message": "Saving uploaded file..."}
-
-        # Save uploaded file
-        with open(input_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Update status
-        processing_status[file_id] = {"status": "processing", "progress": 40, "message": "Loading image..."}
-
-        # Read and process image
-        image = cv2.imread(input_path)
-        if image is None:
-            raise HTTPException(status_code=400, detail="Invalid image file")
-
-        # Update status
-        processing_status[file_id] = {"status": "processing", "progress": 60, "message": "Running YOLO detection..."}
-
-        # Perform detection
-        detections, annotated_image, yolo_labels = detector.detect(image, classes_list)
-
-        # Update status
-        processing_status[file_id] = {"status": "processing", "progress": 80, "message": "Saving results..."}
-
-        # Save annotated image
-        cv2.imwrite(output_path, annotated_image)
-
-        # Save YOLO format labels
-        with open(labels_path, 'w') as f:
-            f.write('\n'.join(yolo_labels))
-
-        # Get image dimensions
-        height, width = image.shape[:2]
-
-        # Clean up input file
-        os.remove(input_path)
+        # Decode, detection and encode; only the blocking steps take an inference worker
+        detections, width, height, (saved_image, saved_labels), tiling = await run_image_prediction(
+            detector, file, file_id, input_path, output_path, labels_path, detect_options, artifacts, tile_options
+        )
 
         # Update status
         processing_status[file_id] = {"status": "completed", "progress": 100, "message": "Detection completed!"}
@@ -276,12 +667,16 @@ async def predict(
                 "height": height,
                 "filename": file.filename
             },
-            "output_image_url": f"/outputs/{output_filename}",
-            "labels_txt_url": f"/labels/{labels_filename}",
+            "output_image_url": f"/outputs/{output_filename}" if saved_image else None,
+            "labels_txt_url": f"/labels/{labels_filename}" if saved_labels else None,
             "parameters": {
+                "model_name": detector.model_name,
                 "conf_threshold": conf_threshold,
                 "iou_threshold": iou_threshold,
-                "selected_classes": classes_list
+                "selected_classes": classes_list,
+                "imgsz": detect_options["imgsz"],
+                "tiling": tiling,
+                "artifacts": artifacts
             },
             "timestamp": datetime.now().isoformat()
         }
@@ -293,297 +688,561 @@ async def predict(
         processing_status[file_id] = {"status": "error", "progress": 0, "message": f"Error: {str(e)}"}
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
-@app.post("/predict_video")
-async def predict_video(
-    file: UploadFile = File(...),
-    conf_threshold: float = Form(0.5),
-    iou_threshold: float = Form(0.45),
-    selected_classes: Optional[str] = Form(None),
-    max_frames: int = Form(30)  # Limit frames for demo
-):
-    # Validate file type
-    if not file.content_type.startswith('video/'):
-        raise HTTPException(status_code=400, detail="File must be a video")
-
+def run_video_prediction(job, detector, input_path, output_path, output_filename, filename, detect_options,
+                         max_frames, sampling_options=None, detect_every=None, events=None, roi=None):
     try:
-        # Update detector thresholds
-        detector.conf_threshold = conf_threshold
-        detector.iou_threshold = iou_threshold
-        if detector.model:
-            detector.model.conf = conf_threshold
-            detector.model.iou = iou_threshold
-
-        # Parse selected classes
-        classes_list = None
-        if selected_classes:
-            try:
-                classes_list = json.loads(selected_classes)
-            except:
-                classes_list = [cls.strip() for cls in selected_classes.split(',') if cls.strip()]
-
-        # Generate unique filename
-        file_id = str(uuid.uuid4())
-        file_extension = os.path.splitext(file.filename)[1]
-        input_filename = f"{file_id}_input{file_extension}"
-        output_filename = f"{file_id}_output.mp4"
-
-        input_path = os.path.join("uploads", input_filename)
-        output_path = os.path.join("outputs", output_filename)
-
-        # Save uploaded file
-        with open(input_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
         # Process video
         cap = cv2.VideoCapture(input_path)
         if not cap.isOpened():
             raise HTTPException(status_code=400, detail="Invalid video file")
 
-        # Get video properties
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        # Get video properties (fps stays fractional, e.g. 29.97, so timestamps do not drift)
+        fps = cap.get(cv2.CAP_PROP_FPS)
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        try:
+            check_roi(roi, (height, width))
+        except HTTPException:
+            cap.release()
+            raise
+
+        # Choose which frames to analyze (the default keeps the first max_frames contiguous frames)
+        sampler = FrameSampler(source_fps=fps, max_frames=max_frames, total_frames=total_frames,
+                               **(sampling_options or {}))
+        # Containers that report no frame rate get the sampler's default instead of a division by zero
+        fps = sampler.source_fps
+        process_frames = sampler.source_limit or total_frames
 
-        # Limit frames for processing
-        process_frames = min(max_frames, total_frames)
+        # The output video holds the analyzed frames, so it plays at the analysis rate
+        output_fps = fps if sampler.step == 1 else sampler.output_fps
 
         # Video writer with better codec
         fourcc = cv2.VideoWriter_fourcc(*'H264')  # Better codec for web compatibility
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        out = cv2.VideoWriter(output_path, fourcc, output_fps, (width, height))
 
         # Check if video writer opened successfully
         if not out.isOpened():
             # Fallback to mp4v codec
             fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+            out = cv2.VideoWriter(output_path, fourcc, output_fps, (width, height))
+
+        video_info = {
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "total_frames": total_frames,
+            "duration": total_frames / fps,
+            "filename": filename
+        }
 
+        # Streaming clients get each frame as it is ready instead of one body at the end
         all_detections = []
-        frame_count = 0
+        counts = {"frames": 0, "detections": 0}
+        if events:
+            events.publish({"type": "start", "file_id": job.id, "video_info": video_info})
 
         # Update processing status
-        processing_status[file_id] = {"status": "processing", "progress": 60, "message": f"Processing video frames (0/{process_frames})..."}
-
-        while frame_count < process_frames:
-            ret, frame = cap.read()
-            if not ret:
-                break
+        job.update(0, f"Processing video frames (0/{process_frames})...",
+                   processed_frames=0, total_frames=process_frames)
 
-            # Update progress
-            progress = 60 + (frame_count / process_frames) * 30
-            processing_status[file_id] = {"status": "processing", "progress": int(progress), "message": f"Processing frame {frame_count + 1}/{process_frames}..."}
-
-            # Perform detection on frame
-            detections, annotated_frame, _ = detector.detect(frame, classes_list)
-
-            # Add frame info to detections
+        def on_frame(index, detections):
+            # Add frame info to detections, timestamped on the source timeline
             frame_detections = {
-                "frame": frame_count,
-                "timestamp": frame_count / fps,
+                "frame": index,
+                "timestamp": index / fps,
                 "detections": detections
             }
-            all_detections.append(frame_detections)
-
-            # Ensure frame is properly formatted
-            if annotated_frame is not None and annotated_frame.shape[:2] == (height, width):
-                out.write(annotated_frame)
+            counts["frames"] += 1
+            counts["detections"] += len(detections)
+            if events:
+                if not events.publish({"type": "frame", **frame_detections}):
+                    # Client disconnected, nobody is waiting for the rest
+                    raise JobCancelled()
             else:
-                # Resize frame if dimensions don't match
-                annotated_frame = cv2.resize(annotated_frame, (width, height))
-                out.write(annotated_frame)
-
-            frame_count += 1
+                all_detections.append(frame_detections)
 
-        cap.release()
-        out.release()
+            # Update progress
+            job.update((index + 1) / process_frames * 100 if process_frames else 0,
+                       f"Processed frame {index + 1}/{process_frames}",
+                       processed_frames=counts["frames"], source_frame=index,
+                       pipeline=pipeline.stats())
+
+        # In tracking mode the model runs on every Kth analyzed frame and tracks carry boxes in between
+        tracker = IoUTracker() if detect_every else None
+        analyzed = [0]
+
+        def detect_frame(index, frame):
+            if tracker is None:
+                return detect_in_roi(detector, frame, roi, detect_options)
+            run_model = analyzed[0] % detect_every == 0
+            analyzed[0] += 1
+            if not run_model:
+                return tracker.predict()
+            return tracker.update(detect_in_roi(detector, frame, roi, detect_options))
+
+        def draw_frame(frame, detections):
+            if roi is not None:
+                roi.draw(frame)
+            return draw_detections(frame, detections, in_place=True)
+
+        # Decoder and encoder threads overlap video I/O with the forward passes
+        pipeline = VideoPipeline(
+            cap, out,
+            detect_fn=detect_frame,
+            draw_fn=draw_frame,
+            sampler=sampler,
+            frame_size=(width, height)
+        )
+        try:
+            pipeline.run(on_frame=on_frame, check_cancelled=job.check_cancelled)
+        finally:
+            cap.release()
+            out.release()
+        job.update(pipeline=pipeline.stats())
 
         # Verify output file was created and has content
         if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
             raise HTTPException(status_code=500, detail="Failed to create output video")
 
-        # Clean up input file
-        os.remove(input_path)
+        job.update(100, "Video processing completed!")
 
-        # Update final status
-        processing_status[file_id] = {"status": "completed", "progress": 100, "message": "Video processing completed!"}
-
-        return {
+        result = {
             "success": True,
-            "file_id": file_id,
-            "video_info": {
-                "width": width,
-                "height": height,
-                "fps": fps,
-                "total_frames": total_frames,
-                "processed_frames": frame_count,
-                "duration": total_frames / fps,
-                "filename": file.filename
-            },
+            "file_id": job.id,
+            "video_info": {**video_info, "processed_frames": counts["frames"]},
             "detections": all_detections,
-            "total_detections": sum(len(fd["detections"]) for fd in all_detections),
+            "total_detections": counts["detections"],
             "output_video_url": f"/outputs/{output_filename}",
+            "pipeline": pipeline.stats(),
+            "tracking": tracker.stats() if tracker else None,
             "parameters": {
-                "conf_threshold": conf_threshold,
-                "iou_threshold": iou_threshold,
-                "selected_classes": classes_list,
-                "max_frames": max_frames
+                "model_name": detector.model_name,
+                "conf_threshold": detect_options["conf_threshold"],
+                "iou_threshold": detect_options["iou_threshold"],
+                "selected_classes": detect_options["selected_classes"],
+                "imgsz": detect_options["imgsz"],
+                "max_frames": max_frames,
+                "sampling": sampling_options or {"mode": "all"},
+                "detect_every": detect_every,
+                "roi": roi.to_dict() if roi is not None else None
             },
             "timestamp": datetime.now().isoformat()
         }
-
-    except HTTPException:
+        if events:
+            # Frames were already streamed, the end event carries the summary
+            events.finish({"type": "end", **{k: v for k, v in result.items() if k != "detections"}})
+        return result
+
+    except JobCancelled:
+        # Drop the partial output of a cancelled job
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        if events:
+            events.finish({"type": "cancelled", "file_id": job.id})
         raise
+
     except Exception as e:
-        print(f"Video prediction error: {e}")
-        processing_status[file_id] = {"status": "error", "progress": 0, "message": f"Error: {str(e)}"}
-        raise HTTPException(status_code=500, detail=f"Video prediction failed: {str(e)}")
+        if events:
+            events.finish({"type": "error", "file_id": job.id, "message": getattr(e, "detail", str(e))})
+        raise
 
-@app.post("/predict_batch")
-async def predict_batch(
-    files: List[UploadFile] = File(...),
+    finally:
+        # Clean up input file
+        if os.path.exists(input_path):
+            os.remove(input_path)
+
+@app.post("/predict_video")
+async def predict_video(
+    file: UploadFile = File(...),
     conf_threshold: float = Form(0.5),
     iou_threshold: float = Form(0.45),
-    selected_classes: Optional[str] = Form(None)
+    selected_classes: Optional[str] = Form(None),
+    max_frames: int = Form(30),  # Limit frames for demo (0 = no limit with sampling)
+    background: bool = Form(False),
+    sampling: str = Form("all"),
+    frame_stride: int = Form(1),
+    target_fps: Optional[float] = Form(None),
+    scene_threshold: float = Form(0.3),
+    tracking: bool = Form(False),
+    detect_every: int = Form(5),
+    stream: str = Form("none"),
+    model_name: Optional[str] = Form(None),
+    imgsz: Optional[int] = Form(None),
+    roi: Optional[str] = Form(None)
 ):
-    # Validate file types
-    for file in files:
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail=f"File {file.filename} must be an image")
+    # Validate file type
+    if not file.content_type.startswith('video/'):
+        raise HTTPException(status_code=400, detail="File must be a video")
+    parse_stream_format(stream)
+    imgsz = parse_imgsz(imgsz)
+    region = parse_roi_form(roi)
+
+    # Validate sampling parameters before accepting the upload
+    sampling_options = {"mode": sampling}
+    if sampling in ("stride", "keyframes"):
+        sampling_options["stride"] = frame_stride
+    if sampling == "fps":
+        sampling_options["target_fps"] = target_fps
+    if sampling == "keyframes":
+        sampling_options["scene_threshold"] = scene_threshold
+    try:
+        FrameSampler(**sampling_options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if tracking and detect_every < 1:
+        raise HTTPException(status_code=400, detail="detect_every must be at least 1")
+    detector = await resolve_detector(model_name)
 
     try:
-        # Generate batch ID
-        batch_id = str(uuid.uuid4())
-        batch_status[batch_id] = {
-            "status": "processing",
-            "progress": 0,
-            "message": "Starting batch processing...",
-            "total_files": len(files),
-            "processed_files": 0,
-            "results": []
+        # Parse selected classes
+        classes_list = parse_selected_classes(selected_classes)
+
+        # Request-scoped inference parameters, passed into the predictor per call
+        detect_options = {
+            "selected_classes": classes_list,
+            "conf_threshold": conf_threshold,
+            "iou_threshold": iou_threshold,
+            "imgsz": imgsz or detector.imgsz
         }
 
-        # Update detector thresholds
-        detector.conf_threshold = conf_threshold
-        detector.iou_threshold = iou_threshold
-        if detector.model:
-            detector.model.conf = conf_threshold
-            detector.model.iou = iou_threshold
+        # Generate unique filename
+        file_id = str(uuid.uuid4())
+        file_extension = os.path.splitext(file.filename)[1]
+        input_filename = f"{file_id}_input{file_extension}"
+        output_filename = f"{file_id}_output.mp4"
 
-        # Parse selected classes
-        classes_list = None
-        if selected_classes:
-            try:
-                classes_list = json.loads(selected_classes)
-            except:
-                classes_list = [cls.strip() for cls in selected_classes.split(',') if cls.strip()]
+        input_path = os.path.join("uploads", input_filename)
+        output_path = os.path.join("outputs", output_filename)
 
-        batch_results = []
-        batch_dir = os.path.join("batch", batch_id)
-        os.makedirs(batch_dir, exist_ok=True)
+        # Save uploaded file before the request returns and the upload is closed
+        await inference_executor.submit(save_upload, file, input_path)
 
-        for idx, file in enumerate(files):
-            try:
-                # Update progress
-                progress = int((idx / len(files)) * 100)
-                batch_status[batch_id]["progress"] = progress
-                batch_status[batch_id]["message"] = f"Processing {file.filename} ({idx + 1}/{len(files)})"
-                batch_status[batch_id]["processed_files"] = idx
-
-                # Generate unique filename for this file
-                file_id = f"{batch_id}_{idx}"
-                file_extension = os.path.splitext(file.filename)[1]
-                input_filename = f"{file_id}_input{file_extension}"
-                output_filename = f"{file_id}_output{file_extension}"
-                labels_filename = f"{file_id}_labels.txt"
-
-                input_path = os.path.join("uploads", input_filename)
-                output_path = os.path.join(batch_dir, output_filename)
-                labels_path = os.path.join(batch_dir, labels_filename)
-
-                # Save uploaded file
-                with open(input_path, "wb") as buffer:
-                    shutil.copyfileobj(file.file, buffer)
-
-                # Read and process image
-                image = cv2.imread(input_path)
-                if image is None:
-                    continue
+        # Decode, detect and encode on a background job worker
+        events = EventStream() if stream != "none" else None
+        try:
+            job = video_jobs.submit(
+                "video", run_video_prediction, detector, input_path, output_path, output_filename, file.filename,
+                detect_options, max_frames, sampling_options, detect_every if tracking else None,
+                events=events, roi=region, job_id=file_id
+            )
+        except HTTPException:
+            os.remove(input_path)
+            raise
+
+        if events:
+            async def frame_events():
+                try:
+                    async for chunk in events.iter_formatted(stream):
+                        yield chunk
+                finally:
+                    # Stop work nobody will receive
+                    if not job.finished:
+                        video_jobs.cancel(job.id)
+
+            return StreamingResponse(frame_events(), media_type=STREAM_FORMATS[stream],
+                                     headers={"X-Job-Id": job.id})
+
+        if background:
+            return JSONResponse(status_code=202, content={
+                "success": True,
+                "job_id": job.id,
+                "file_id": job.id,
+                "status": job.status,
+                "status_url": f"/status/{job.id}",
+                "timestamp": datetime.now().isoformat()
+            })
+
+        # Without background mode the request waits for the job, whose progress is still pollable
+        await asyncio.wrap_future(job.future)
+        if job.status == "cancelled":
+            raise HTTPException(status_code=409, detail="Video processing was cancelled")
+        if job.status != "completed":
+            raise HTTPException(status_code=job.error_status or 500, detail=job.error or job.message)
+        return job.result
 
-                # Perform detection
-                detections, annotated_image, yolo_labels = detector.detect(image, classes_list)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Video prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Video prediction failed: {str(e)}")
 
-                # Save annotated image
-                cv2.imwrite(output_path, annotated_image)
+def batch_item_paths(file, idx, batch_id, batch_dir):
+    # Generate unique filename for this file
+    file_id = f"{batch_id}_{idx}"
+    file_extension = os.path.splitext(file.filename)[1]
+    return {
+        "file_id": file_id,
+        "input_path": os.path.join("uploads", f"{file_id}_input{file_extension}"),
+        "output_filename": f"{file_id}_output{file_extension}",
+        "labels_filename": f"{file_id}_labels.txt"
+    }
 
-                # Save YOLO format labels
-                with open(labels_path, 'w') as f:
-                    f.write('\n'.join(yolo_labels))
+def encode_batch_item(file, paths, batch_id, batch_dir, image, detections, yolo_labels, artifacts="all"):
+    output_path = os.path.join(batch_dir, paths["output_filename"])
+    labels_path = os.path.join(batch_dir, paths["labels_filename"])
 
-                # Get image dimensions
-                height, width = image.shape[:2]
+    # Draw only when the annotated image is kept
+    write_image, _ = ARTIFACT_MODES[artifacts]
+    annotated_image = draw_detections(image, detections) if write_image else None
 
-                # Clean up input file
-                os.remove(input_path)
+    # Save annotated image and/or YOLO format labels
+    saved_image, saved_labels = save_artifacts(artifacts, image, annotated_image, yolo_labels, output_path, labels_path)
 
-                result = {
-                    "file_id": file_id,
-                    "filename": file.filename,
-                    "detections": detections,
-                    "total_detections": len(detections),
-                    "image_info": {
-                        "width": width,
-                        "height": height
-                    },
-                    "output_image_url": f"/batch/{batch_id}/{output_filename}",
-                    "labels_txt_url": f"/batch/{batch_id}/{labels_filename}"
-                }
+    # Get image dimensions
+    height, width = image.shape[:2]
 
-                batch_results.append(result)
-                batch_status[batch_id]["results"].append(result)
+    return {
+        "file_id": paths["file_id"],
+        "filename": file.filename,
+        "detections": detections,
+        "total_detections": len(detections),
+        "image_info": {
+            "width": width,
+            "height": height
+        },
+        "output_image_url": f"/batch/{batch_id}/{paths['output_filename']}" if saved_image else None,
+        "labels_txt_url": f"/batch/{batch_id}/{paths['labels_filename']}" if saved_labels else None
+    }
 
+def read_spooled_image(path):
+    """Decode an upload that was saved to disk before its request returned, removing the copy"""
+    try:
+        return cv2.imread(path)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+async def process_batch(batch_id, files, detector, detect_options, artifacts, spooled=False):
+    """Run a batch and return its results in upload order, keeping batch_status[batch_id] current
+
+    With spooled, every upload was already saved to its input path (background
+    batches outlive their request, and with it the open uploads).
+    """
+    status = batch_status[batch_id]
+    try:
+        batch_dir = os.path.join("batch", batch_id)
+        os.makedirs(batch_dir, exist_ok=True)
+
+        # Files go through decode -> batched detect -> draw/save in chunks of one model batch.
+        # Decoding the next chunk and saving the previous one overlap with detection, while
+        # at most one pool worker's worth of tasks per stage keeps room for other requests.
+        chunk_size = max(1, detector.batcher.max_batch_size)
+        io_slots = asyncio.Semaphore(inference_executor.max_workers)
+        slots = [None] * len(files)
+        finished = [0]
+
+        async def on_pool(fn, *args):
+            async with io_slots:
+                return await inference_executor.submit(fn, *args)
+
+        def item_done(idx, result):
+            slots[idx] = result
+            finished[0] += 1
+            # Partial results stay in upload order
+            status["results"] = [r for r in slots if r is not None]
+            status["processed_files"] = finished[0]
+            status["progress"] = int(finished[0] / len(files) * 100)
+            status["message"] = f"Processed {files[idx].filename} ({finished[0]}/{len(files)})"
+
+        def decode(file, input_path):
+            if spooled:
+                return on_pool(read_spooled_image, input_path)
+            return on_pool(decode_upload_image, file, input_path)
+
+        async def decode_chunk(start):
+            chunk = list(enumerate(files[start:start + chunk_size], start))
+            paths = [batch_item_paths(file, idx, batch_id, batch_dir) for idx, file in chunk]
+            images = await asyncio.gather(
+                *(decode(file, p["input_path"]) for (_, file), p in zip(chunk, paths)),
+                return_exceptions=True)
+            return chunk, paths, images
+
+        async def encode_item(idx, file, paths, image, detections, yolo_labels):
+            try:
+                result = await on_pool(encode_batch_item, file, paths, batch_id, batch_dir, image,
+                                       detections, yolo_labels, artifacts)
             except Exception as e:
                 print(f"Error processing {file.filename}: {e}")
+                result = None
+            item_done(idx, result)
+
+        encodes = []
+        next_chunk = asyncio.ensure_future(decode_chunk(0))
+        for start in range(0, len(files), chunk_size):
+            chunk, paths, images = await next_chunk
+            if start + chunk_size < len(files):
+                next_chunk = asyncio.ensure_future(decode_chunk(start + chunk_size))
+
+            decoded = []
+            for (idx, file), item_paths, image in zip(chunk, paths, images):
+                if isinstance(image, Exception) or image is None:
+                    if isinstance(image, Exception):
+                        print(f"Error processing {file.filename}: {image}")
+                    item_done(idx, None)
+                else:
+                    decoded.append((idx, file, item_paths, image))
+            if not decoded:
+                continue
+
+            try:
+                # One detector call for the whole chunk so its images share forward passes
+                outputs = await inference_executor.submit(
+                    detector.detect_many, [item[3] for item in decoded], use_cache=True, **detect_options)
+            except Exception as e:
+                print(f"Error processing batch chunk: {e}")
+                for idx, *_ in decoded:
+                    item_done(idx, None)
                 continue
 
+            for (idx, file, item_paths, image), (detections, yolo_labels) in zip(decoded, outputs):
+                encodes.append(asyncio.ensure_future(
+                    encode_item(idx, file, item_paths, image, detections, yolo_labels)))
+
+        await asyncio.gather(*encodes)
+
         # Update final status
-        batch_status[batch_id]["status"] = "completed"
-        batch_status[batch_id]["progress"] = 100
-        batch_status[batch_id]["message"] = "Batch processing completed!"
-        batch_status[batch_id]["processed_files"] = len(files)
+        status["status"] = "completed"
+        status["progress"] = 100
+        status["message"] = "Batch processing completed!"
+        status["processed_files"] = len(files)
+        return [r for r in slots if r is not None]
 
-        return {
+    except Exception as e:
+        print(f"Batch prediction error: {e}")
+        status["status"] = "error"
+        status["message"] = f"Error: {getattr(e, 'detail', str(e))}"
+        raise
+
+async def run_background_batch(*args):
+    try:
+        await process_batch(*args, spooled=True)
+    except Exception:
+        # Already recorded in batch_status for the client polling it
+        pass
+
+# Running background batches, referenced so their tasks are not garbage collected
+background_batches = set()
+
+@app.post("/predict_batch")
+async def predict_batch(
+    files: List[UploadFile] = File(...),
+    conf_threshold: float = Form(0.5),
+    iou_threshold: float = Form(0.45),
+    selected_classes: Optional[str] = Form(None),
+    artifacts: str = Form("all"),
+    model_name: Optional[str] = Form(None),
+    imgsz: Optional[int] = Form(None),
+    background: bool = Form(False)
+):
+    # Validate file types
+    for file in files:
+        if not file.content_type.startswith('image/'):
+            raise HTTPException(status_code=400, detail=f"File {file.filename} must be an image")
+    parse_artifacts(artifacts)
+    imgsz = parse_imgsz(imgsz)
+    detector = await resolve_detector(model_name)
+
+    # Parse selected classes
+    classes_list = parse_selected_classes(selected_classes)
+
+    # Request-scoped inference parameters, passed into the predictor per call
+    detect_options = {
+        "selected_classes": classes_list,
+        "conf_threshold": conf_threshold,
+        "iou_threshold": iou_threshold,
+        "imgsz": imgsz or detector.imgsz
+    }
+    parameters = {
+        "model_name": detector.model_name,
+        "conf_threshold": conf_threshold,
+        "iou_threshold": iou_threshold,
+        "selected_classes": classes_list,
+        "imgsz": detect_options["imgsz"],
+        "artifacts": artifacts
+    }
+
+    # Generate batch ID
+    batch_id = str(uuid.uuid4())
+    batch_status[batch_id] = {
+        "status": "processing",
+        "progress": 0,
+        "message": "Starting batch processing...",
+        "total_files": len(files),
+        "processed_files": 0,
+        "results": [],
+        "parameters": parameters
+    }
+
+    if background:
+        # Save the uploads before the request returns and they are closed, then process them from disk
+        batch_dir = os.path.join("batch", batch_id)
+        try:
+            for idx, file in enumerate(files):
+                paths = batch_item_paths(file, idx, batch_id, batch_dir)
+                await inference_executor.submit(save_upload, file, paths["input_path"])
+        except Exception as e:
+            batch_status[batch_id]["status"] = "error"
+            batch_status[batch_id]["message"] = f"Error: {getattr(e, 'detail', str(e))}"
+            for idx, file in enumerate(files):
+                input_path = batch_item_paths(file, idx, batch_id, batch_dir)["input_path"]
+                if os.path.exists(input_path):
+                    os.remove(input_path)
+            raise
+        task = asyncio.ensure_future(run_background_batch(batch_id, files, detector, detect_options, artifacts))
+        background_batches.add(task)
+        task.add_done_callback(background_batches.discard)
+        return JSONResponse(status_code=202, content={
             "success": True,
             "batch_id": batch_id,
             "total_files": len(files),
-            "processed_files": len(batch_results),
-            "results": batch_results,
+            "status": "processing",
+            "status_url": f"/batch_status/{batch_id}",
             "batch_url": f"/batch/{batch_id}",
-            "parameters": {
-                "conf_threshold": conf_threshold,
-                "iou_threshold": iou_threshold,
-                "selected_classes": classes_list
-            },
             "timestamp": datetime.now().isoformat()
-        }
+        })
 
+    try:
+        batch_results = await process_batch(batch_id, files, detector, detect_options, artifacts)
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Batch prediction error: {e}")
-        if batch_id in batch_status:
-            batch_status[batch_id]["status"] = "error"
-            batch_status[batch_id]["message"] = f"Error: {str(e)}"
         raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
 
+    return {
+        "success": True,
+        "batch_id": batch_id,
+        "total_files": len(files),
+        "processed_files": len(batch_results),
+        "results": batch_results,
+        "batch_url": f"/batch/{batch_id}",
+        "parameters": parameters,
+        "timestamp": datetime.now().isoformat()
+    }
+
 @app.get("/status/{file_id}")
 async def get_processing_status(file_id: str):
-    if file_id in processing_status:
+    job = video_jobs.get(file_id) or model_jobs.get(file_id)
+    if job is not None:
+        return job.to_dict()
+    elif file_id in processing_status:
         return processing_status[file_id]
     elif file_id in batch_status:
         return batch_status[file_id]
     else:
         raise HTTPException(status_code=404, detail="File ID not found")
 
+@app.get("/jobs")
+async def list_jobs():
+    return {"jobs": video_jobs.list() + model_jobs.list(), **video_jobs.stats(), "model_jobs": model_jobs.stats()}
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = video_jobs.cancel(job_id) or model_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job ID not found")
+    return {"success": True, "job_id": job_id, "status": job.status, "message": "Cancellation requested"}
+
 @app.get("/batch_status/{batch_id}")
 async def get_batch_status(batch_id: str):
     if batch_id in batch_status:
@@ -591,6 +1250,31 @@ async def get_batch_status(batch_id: str):
     else:
         raise HTTPException(status_code=404, detail="Batch ID not found")
 
+@app.get("/batch_download/{batch_id}")
+async def download_batch(batch_id: str, format: str = "zip"):
+    """Stream every output of a batch as one archive, built while it is being sent"""
+    if format not in ARCHIVE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(ARCHIVE_FORMATS)}")
+    try:
+        batch_id = str(uuid.UUID(batch_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Batch ID not found")
+    batch_dir = os.path.join("batch", batch_id)
+    if not os.path.isdir(batch_dir):
+        raise HTTPException(status_code=404, detail="Batch ID not found")
+
+    # Include the detections alongside the files when the batch is still known
+    extra_files = {}
+    if batch_id in batch_status:
+        extra_files["results.json"] = json.dumps(batch_status[batch_id], indent=2).encode()
+
+    media_type, extension = ARCHIVE_FORMATS[format]
+    return StreamingResponse(
+        iter_archive(batch_dir, format, extra_files),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="batch_{batch_id}{extension}"'}
+    )
+
 @app.delete("/cleanup/{file_id}")
 async def cleanup_files(file_id: str):
     try:
@@ -614,71 +1298,127 @@ async def cleanup_files(file_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Cleanup failed: {str(e)}")
 
+def run_model_swap(job, model_name, build_detector):
+    """Load and warm a model off the request path, then make it the default in one step
+
+    Requests that already resolved the previous detector keep it until they
+    finish; only requests arriving after the swap see the new one.
+    """
+    job.update(10, f"Loading {model_name}...", model_name=model_name)
+    detector = build_detector()
+    try:
+        job.check_cancelled()
+        job.update(60, f"Warming up {model_name}...")
+        detector.warmup()
+        job.check_cancelled()
+    except Exception:
+        detector.close()
+        raise
+
+    model_registry.add(model_name, detector, make_default=True)
+    job.update(100, "Model swapped in")
+    return {
+        "success": True,
+        "model_name": model_name,
+        "conf_threshold": detector.conf_threshold,
+        "iou_threshold": detector.iou_threshold,
+        "device": detector.device,
+        "backend": detector.runtime.info(),
+        "total_classes": len(detector.class_names),
+        "custom_model": detector.model_name != split_model_name(model_name)[0],
+        "warmup_seconds": detector.warmup_seconds,
+        "resident_models": [m["name"] for m in model_registry.resident()],
+        "message": "Model updated successfully"
+    }
+
+async def swap_model(model_name, build_detector, background):
+    job = model_jobs.submit("model", run_model_swap, model_name, build_detector)
+    if background:
+        return JSONResponse(status_code=202, content={
+            "success": True,
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/status/{job.id}",
+            "timestamp": datetime.now().isoformat()
+        })
+    await asyncio.wrap_future(job.future)
+    if job.status != "completed":
+        raise HTTPException(status_code=job.error_status or 500, detail=f"Model update failed: {job.error or job.message}")
+    return job.result
+
+def select_backend(backend=None, quantize=None):
+    """Backend for the backend/quantize form fields of the model endpoints, or None when neither is set"""
+    if quantize:
+        if quantize not in QUANTIZATION_MODES:
+            raise HTTPException(status_code=400, detail=f"quantize must be one of: {', '.join(QUANTIZATION_MODES)}")
+        if backend and backend != "onnx":
+            raise HTTPException(status_code=400, detail="INT8 quantization runs on the onnx backend")
+        return QUANTIZATION_MODES[quantize]
+    if backend and backend not in BACKENDS:
+        raise HTTPException(status_code=400, detail=f"backend must be one of: {', '.join(BACKENDS)}")
+    return backend or None
+
 @app.post("/update_model")
 async def update_model(
     model_name: str = Form("yolov8n.pt"),
     conf_threshold: float = Form(0.5),
-    iou_threshold: float = Form(0.45)
+    iou_threshold: float = Form(0.45),
+    background: bool = Form(False),
+    backend: Optional[str] = Form(None),
+    quantize: Optional[str] = Form(None)
 ):
-    try:
-        global detector
-        # Check if model exists in models/ directory
-        model_path = os.path.join("models", model_name)
-        classes_path = os.path.join("models", os.path.splitext(model_name)[0] + ".txt")
-        if os.path.exists(model_path) and os.path.exists(classes_path):
-            # Load custom classes
-            with open(classes_path, "r") as f:
-                custom_classes = [line.strip() for line in f if line.strip()]
-            class CustomYOLODetector(YOLODetector):
-                def __init__(self, model_name, conf_threshold=0.5, iou_threshold=0.45, class_names=None):
-                    self.model_name = model_name
-                    self.conf_threshold = conf_threshold
-                    self.iou_threshold = iou_threshold
-                    self.model = None
-                    self.class_names = class_names if class_names else COCO_CLASSES
-                    self.device = "cuda" if torch.cuda.is_available() else "cpu"
-                    self.load_model()
-            detector = CustomYOLODetector(model_path, conf_threshold, iou_threshold, class_names=custom_classes)
-            used_classes = custom_classes
-            used_model = model_path
-        else:
-            # Use predefined model and COCO classes
-            detector = YOLODetector(model_name, conf_threshold, iou_threshold)
-            used_classes = COCO_CLASSES
-            used_model = model_name
+    # quantize=dynamic|static serves an INT8 copy of the model (built and evaluated on first use)
+    backend = select_backend(backend, quantize)
+    if backend:
+        model_name = f"{split_model_name(model_name)[0]}@{backend}"
+    detector = model_registry.peek(model_name)
+    if detector is not None:
+        # Already resident and warm: switch to it and only change its default thresholds
+        detector.conf_threshold = conf_threshold
+        detector.iou_threshold = iou_threshold
+        model_registry.set_default(model_name)
         return {
             "success": True,
             "model_name": model_name,
             "conf_threshold": conf_threshold,
             "iou_threshold": iou_threshold,
             "device": detector.device,
-            "total_classes": len(used_classes),
-            "message": "Model updated successfully",
-            "custom_model": os.path.exists(model_path) and os.path.exists(classes_path)
+            "backend": detector.runtime.info(),
+            "total_classes": len(detector.class_names),
+            "custom_model": detector.model_name != split_model_name(model_name)[0],
+            "resident_models": [m["name"] for m in model_registry.resident()],
+            "message": "Model updated successfully"
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Model update failed: {str(e)}")
+
+    # Uses models/<name> with its classes file when present, otherwise a predefined model
+    return await swap_model(
+        model_name,
+        lambda: load_detector(model_name, conf_threshold, iou_threshold, warmup=False),
+        background
+    )
 
 @app.post("/upload_model")
 async def upload_model(
     model_file: UploadFile = File(...),
-    classes_file: UploadFile = File(...)
+    classes_file: UploadFile = File(...),
+    background: bool = Form(False),
+    backend: Optional[str] = Form(None),
+    quantize: Optional[str] = Form(None)
 ):
     # Validate file types
     if not model_file.filename.endswith(".pt"):
         raise HTTPException(status_code=400, detail="Model file must be a .pt file")
     if not classes_file.filename.endswith(".txt"):
         raise HTTPException(status_code=400, detail="Classes file must be a .txt file")
+    backend = select_backend(backend, quantize) or "torch"
 
     # Save model file
     model_save_path = os.path.join("models", model_file.filename)
-    with open(model_save_path, "wb") as f:
-        shutil.copyfileobj(model_file.file, f)
+    await inference_executor.submit(save_upload, model_file, model_save_path)
 
-    # Save classes file
-    classes_save_path = os.path.join("models", classes_file.filename)
-    with open(classes_save_path, "wb") as f:
-        shutil.copyfileobj(classes_file.file, f)
+    # Save classes file as <model stem>.txt, where load_detector finds it when the model is reloaded
+    classes_save_path = os.path.join("models", os.path.splitext(model_file.filename)[0] + ".txt")
+    await inference_executor.submit(save_upload, classes_file, classes_save_path)
 
     # Read class names from classes.txt
     try:
@@ -689,60 +1429,113 @@ async def upload_model(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to read classes.txt: {str(e)}")
 
-    # Update detector to use the new model and classes
-    global detector
-    class CustomYOLODetector(YOLODetector):
-        def __init__(self, model_name, conf_threshold=0.5, iou_threshold=0.45, class_names=None):
-            self.model_name = model_name
-            self.conf_threshold = conf_threshold
-            self.iou_threshold = iou_threshold
-            self.model = None
-            self.class_names = class_names if class_names else COCO_CLASSES
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
-            self.load_model()
-    detector = CustomYOLODetector(model_save_path, class_names=custom_classes)
-
+    # Load the new model and classes in the background and swap it in once warm;
+    # the model serving requests meanwhile stays resident and untouched until then.
+    # Built through load_detector, the same path that reloads it by name after an eviction
+    registry_name = model_file.filename if backend == "torch" else f"{model_file.filename}@{backend}"
+    response = await swap_model(
+        registry_name,
+        lambda: load_detector(registry_name, warmup=False),
+        background
+    )
+    if background:
+        return response
     return {
-        "success": True,
-        "model_name": model_file.filename,
-        "classes_file": classes_file.filename,
-        "total_classes": len(custom_classes),
+        **response,
+        "classes_file": os.path.basename(classes_save_path),
         "message": "Custom model and classes uploaded and loaded successfully."
     }
 
-@app.post("/predict_stream")
-async def predict_stream(
-    stream_url: str = Form(...),
-    conf_threshold: float = Form(0.5),
-    iou_threshold: float = Form(0.45),
-    max_frames: int = Form(10)
-):
+def run_stream_prediction(detector, stream_url, detect_options, max_frames, events=None, roi=None):
+    cap = cv2.VideoCapture(stream_url)
+    if not cap.isOpened():
+        raise HTTPException(status_code=400, detail="Could not open stream. Check the URL and network.")
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    if width > 0 and height > 0:
+        try:
+            check_roi(roi, (height, width))
+        except HTTPException:
+            cap.release()
+            raise
+
+    frame_detections = []
+    frame_count = 0
+    total_detections = 0
     try:
-        # Update detector thresholds
-        detector.conf_threshold = conf_threshold
-        detector.iou_threshold = iou_threshold
-        if detector.model:
-            detector.model.conf = conf_threshold
-            detector.model.iou = iou_threshold
-
-        cap = cv2.VideoCapture(stream_url)
-        if not cap.isOpened():
-            raise HTTPException(status_code=400, detail="Could not open stream. Check the URL and network.")
-
-        frame_detections = []
-        frame_count = 0
-        while frame_count < max_frames:
+        # A streaming client may ask for frames until it disconnects (max_frames <= 0)
+        while frame_count < max_frames or (events and max_frames <= 0):
             ret, frame = cap.read()
             if not ret:
                 break
-            detections, _ = detector.detect(frame)
-            frame_detections.append({
+            detections = detect_in_roi(detector, frame, roi, detect_options)
+            record = {
                 "frame": frame_count,
                 "detections": detections
-            })
+            }
             frame_count += 1
+            total_detections += len(detections)
+            if events:
+                if not events.publish({"type": "frame", **record}):
+                    break
+            else:
+                frame_detections.append(record)
+    finally:
         cap.release()
 
+    if events:
+        events.finish({"type": "end", "frames_processed": frame_count, "total_detections": total_detections})
+    return frame_detections
+
+@app.post("/predict_stream")
+async def predict_stream(
+    stream_url: str = Form(...),
+    conf_threshold: float = Form(0.5),
+    iou_threshold: float = Form(0.45),
+    max_frames: int = Form(10),
+    stream: str = Form("none"),
+    model_name: Optional[str] = Form(None),
+    imgsz: Optional[int] = Form(None),
+    roi: Optional[str] = Form(None)
+):
+    parse_stream_format(stream)
+    imgsz = parse_imgsz(imgsz)
+    region = parse_roi_form(roi)
+    detector = await resolve_detector(model_name)
+    try:
+        detect_options = {
+            "conf_threshold": conf_threshold,
+            "iou_threshold": iou_threshold,
+            "imgsz": imgsz or detector.imgsz
+        }
+
+        if stream != "none":
+            events = EventStream()
+
+            async def run():
+                try:
+                    await stream_readers.submit(run_stream_prediction, detector, stream_url, detect_options,
+                                                max_frames, events, region)
+                except Exception as e:
+                    events.finish({"type": "error", "message": getattr(e, "detail", str(e))})
+
+            async def frame_events():
+                reader = asyncio.ensure_future(run())
+                try:
+                    async for chunk in events.iter_formatted(stream):
+                        yield chunk
+                finally:
+                    # The reader loop notices the closed stream and releases the capture
+                    events.close()
+                    reader.cancel()
+
+            return StreamingResponse(frame_events(), media_type=STREAM_FORMATS[stream])
+
+        # Connect and read on a stream reader thread; detection itself goes through the model's batcher
+        frame_detections = await stream_readers.submit(run_stream_prediction, detector, stream_url, detect_options,
+                                                       max_frames, None, region)
+        frame_count = len(frame_detections)
+
         return {
             "success": True,
             "stream_url": stream_url,
@@ -750,9 +1543,12 @@ async def predict_stream(
             "detections_per_frame": frame_detections,
             "total_detections": sum(len(fd["detections"]) for fd in frame_detections),
             "parameters": {
+                "model_name": detector.model_name,
                 "conf_threshold": conf_threshold,
                 "iou_threshold": iou_threshold,
-                "max_frames": max_frames
+                "imgsz": detect_options["imgsz"],
+                "max_frames": max_frames,
+                "roi": region.to_dict() if region is not None else None
             },
             "timestamp": datetime.now().isoformat()
         }
@@ -762,6 +1558,192 @@ async def predict_stream(
         print(f"Stream prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Stream prediction failed: {str(e)}")
 
+@app.post("/streams")
+async def start_stream_session(
+    stream_url: str = Form(...),
+    conf_threshold: float = Form(0.5),
+    iou_threshold: float = Form(0.45),
+    selected_classes: Optional[str] = Form(None),
+    detect_fps: Optional[float] = Form(None),
+    model_name: Optional[str] = Form(None),
+    imgsz: Optional[int] = Form(None),
+    roi: Optional[str] = Form(None)
+):
+    """Open a live stream once and keep detecting on its latest frame until stopped"""
+    if detect_fps is not None and detect_fps <= 0:
+        raise HTTPException(status_code=400, detail="detect_fps must be positive")
+    imgsz = parse_imgsz(imgsz)
+    region = parse_roi_form(roi)
+
+    classes_list = parse_selected_classes(selected_classes)
+    detect_options = {
+        "selected_classes": classes_list,
+        "conf_threshold": conf_threshold,
+        "iou_threshold": iou_threshold,
+        # None follows the size of whichever model serves the session
+        "imgsz": imgsz
+    }
+
+    # Load a named model up front; sessions without one follow the default model
+    if model_name:
+        await resolve_detector(model_name)
+
+    # Opening a network stream can take seconds, so it happens on the worker pool
+    session = await inference_executor.submit(stream_sessions.start, stream_url, detect_options, detect_fps,
+                                              model_name, region)
+    return {"success": True, **session.to_dict()}
+
+@app.get("/streams")
+async def list_stream_sessions():
+    return {"sessions": stream_sessions.list()}
+
+@app.get("/streams/{session_id}")
+async def get_stream_session(session_id: str):
+    session = stream_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Stream session not found")
+    return session.to_dict(include_result=True)
+
+@app.get("/streams/{session_id}/events")
+async def subscribe_stream_session(session_id: str, stream: str = "ndjson"):
+    """Follow a session's detections as NDJSON or SSE; slow clients skip results rather than lag"""
+    if stream not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"stream must be one of: {', '.join(STREAM_FORMATS)}")
+    session = stream_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Stream session not found")
+
+    events = EventStream(drop_when_full=True)
+    session.subscribe(events)
+
+    async def session_events():
+        try:
+            async for chunk in events.iter_formatted(stream):
+                yield chunk
+        finally:
+            session.unsubscribe(events)
+
+    return StreamingResponse(session_events(), media_type=STREAM_FORMATS[stream])
+
+@app.put("/streams/{session_id}/roi")
+async def update_stream_roi(session_id: str, roi: Optional[str] = Form(None)):
+    """Replace a session's region of interest; an empty roi analyzes the whole frame again"""
+    session = stream_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Stream session not found")
+    session.set_roi(parse_roi_form(roi))
+    return {"success": True, **session.to_dict()}
+
+@app.delete("/streams/{session_id}")
+async def stop_stream_session(session_id: str):
+    session = await inference_executor.submit(stream_sessions.stop, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Stream session not found")
+    return {"success": True, **session.to_dict()}
+
+def detect_encoded_frame(detector, data, detect_options):
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise HTTPException(status_code=400, detail="Could not decode frame")
+    detections, _, _ = detector.detect(image, annotate=False, **detect_options)
+    height, width = image.shape[:2]
+    return detections, width, height
+
+def parse_ws_options(params):
+    """Detection options from WebSocket query parameters or a JSON text message"""
+    options = {}
+    if params.get("conf_threshold") is not None:
+        options["conf_threshold"] = float(params["conf_threshold"])
+    if params.get("iou_threshold") is not None:
+        options["iou_threshold"] = float(params["iou_threshold"])
+    selected = params.get("selected_classes")
+    if isinstance(selected, str):
+        selected = parse_selected_classes(selected)
+    if selected:
+        options["selected_classes"] = selected
+    if params.get("imgsz") is not None:
+        options["imgsz"] = check_imgsz(params["imgsz"])
+    return options
+
+@app.websocket("/ws/detect")
+async def detect_websocket(websocket: WebSocket):
+    """Binary JPEG/PNG frames in, one JSON detection message out per processed frame
+
+    When frames arrive faster than inference, the oldest waiting frames are
+    dropped so replies always describe the most recent picture. A JSON text
+    message changes the thresholds or class filter for the following frames.
+    """
+    await websocket.accept()
+    try:
+        detect_options = parse_ws_options(websocket.query_params)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+    try:
+        detector = await resolve_detector(websocket.query_params.get("model_name"))
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "message": e.detail})
+        await websocket.close(code=1011)
+        return
+
+    pending = asyncio.Queue(maxsize=WS_MAX_PENDING_FRAMES)
+    counters = {"received": 0, "dropped": 0}
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("text") is not None:
+                    try:
+                        detect_options.update(parse_ws_options(json.loads(message["text"])))
+                    except (ValueError, TypeError, AttributeError):
+                        await websocket.send_json({"type": "error", "message": "Invalid options message"})
+                    continue
+                data = message.get("bytes")
+                if not data:
+                    continue
+                counters["received"] += 1
+                if pending.full():
+                    # Drop the oldest frame so the next reply is as fresh as possible
+                    pending.get_nowait()
+                    counters["dropped"] += 1
+                pending.put_nowait((counters["received"] - 1, time.time(), data))
+        finally:
+            if pending.full():
+                pending.get_nowait()
+            pending.put_nowait(None)
+
+    reader = asyncio.ensure_future(receive_frames())
+    try:
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+            frame_index, received_at, data = item
+            start = time.time()
+            try:
+                detections, width, height = await inference_executor.submit(
+                    detect_encoded_frame, detector, data, dict(detect_options))
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "frame": frame_index, "message": e.detail})
+                continue
+            await websocket.send_json({
+                "type": "detections",
+                "frame": frame_index,
+                "width": width,
+                "height": height,
+                "detections": detections,
+                "inference_ms": round((time.time() - start) * 1000, 2),
+                "latency_ms": round((time.time() - received_at) * 1000, 2),
+                "dropped": counters["dropped"]
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
@@ -0,0 +1,127 @@
+import os
+import tarfile
+import time
+import zipfile
+
+ARCHIVE_FORMATS = {
+    "zip": ("application/zip", ".zip"),
+    "tar": ("application/x-tar", ".tar")
+}
+
+# Already-compressed outputs are stored as-is; deflating them only costs CPU
+STORED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".mp4", ".avi", ".mov"}
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ChunkBuffer:
+    """Write-only, unseekable file object whose contents are collected and handed out in pieces"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        if data:
+            self._chunks.append(bytes(data))
+            self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def archive_entries(directory):
+    """(arcname, path) pairs for every file under directory, in a stable order"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, directory), path
+
+
+def iter_zip(directory, extra_files=None):
+    """Yield a ZIP of directory piece by piece; nothing is built in memory or on disk first
+
+    extra_files maps archive names to bytes added at the end (e.g. a results manifest).
+    """
+    buffer = ChunkBuffer()
+    # Without a seekable target zipfile writes sizes in data descriptors after each entry
+    with zipfile.ZipFile(buffer, mode="w", allowZip64=True) as archive:
+        for arcname, path in archive_entries(directory):
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            stored = os.path.splitext(path)[1].lower() in STORED_EXTENSIONS
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            with open(path, "rb") as source, archive.open(info, mode="w") as target:
+                while True:
+                    data = source.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    target.write(data)
+                    chunk = buffer.drain()
+                    if chunk:
+                        yield chunk
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+        for arcname, data in (extra_files or {}).items():
+            archive.writestr(arcname, data, compress_type=zipfile.ZIP_DEFLATED)
+    # Central directory
+    chunk = buffer.drain()
+    if chunk:
+        yield chunk
+
+
+def tar_header(arcname, size, mtime, mode=0o644):
+    info = tarfile.TarInfo(arcname)
+    info.size = size
+    info.mtime = int(mtime)
+    info.mode = mode
+    return info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+
+def tar_padding(size):
+    remainder = size % tarfile.BLOCKSIZE
+    return tarfile.NUL * (tarfile.BLOCKSIZE - remainder) if remainder else b""
+
+
+def iter_tar(directory, extra_files=None):
+    """Yield an uncompressed tar of directory, reading each file CHUNK_SIZE bytes at a time
+
+    Headers and block padding are written here rather than through tarfile,
+    whose addfile() copies a whole member before anything can be sent.
+    """
+    for arcname, path in archive_entries(directory):
+        with open(path, "rb") as source:
+            stat = os.fstat(source.fileno())
+            size = stat.st_size
+            yield tar_header(arcname, size, stat.st_mtime, stat.st_mode & 0o7777)
+            remaining = size
+            while remaining > 0:
+                data = source.read(min(CHUNK_SIZE, remaining))
+                if not data:
+                    # The file shrank while being sent; keep the header's size
+                    data = tarfile.NUL * min(CHUNK_SIZE, remaining)
+                remaining -= len(data)
+                yield data
+        padding = tar_padding(size)
+        if padding:
+            yield padding
+    for arcname, data in (extra_files or {}).items():
+        yield tar_header(arcname, len(data), time.time()) + data + tar_padding(len(data))
+    # End-of-archive marker
+    yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+
+
+def iter_archive(directory, archive_format="zip", extra_files=None):
+    if archive_format == "tar":
+        return iter_tar(directory, extra_files)
+    return iter_zip(directory, extra_files)
@@ -0,0 +1,246 @@
+import abc
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+from postprocess import empty_arrays, result_arrays
+from quantization import QUANTIZATION_MODES, load_report, quantize_model
+
+# onnx-int8 / onnx-int8-static serve a dynamically / statically quantized copy of the onnx export
+BACKENDS = ("torch", "onnx", "openvino") + tuple(QUANTIZATION_MODES.values())
+
+# Letterbox padding value used by ultralytics
+PAD_VALUE = (114, 114, 114)
+
+# Inference sizes are rounded up to a multiple of the largest YOLOv8 stride
+MODEL_STRIDE = 32
+
+
+def split_model_name(name, default_backend=None):
+    """'yolov8n.pt@onnx' -> ('yolov8n.pt', 'onnx'); names without a suffix use the default backend"""
+    model_name, _, backend = str(name).partition("@")
+    backend = backend or default_backend or os.getenv("INFERENCE_BACKEND", "torch")
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of: {', '.join(BACKENDS)}")
+    return model_name, backend
+
+
+def check_imgsz(imgsz, max_imgsz=None):
+    """Validated inference size rounded up to a multiple of the model stride, or None when not given"""
+    if imgsz is None:
+        return None
+    max_imgsz = max_imgsz or int(os.getenv("MAX_IMGSZ", 2048))
+    imgsz = int(imgsz)
+    if imgsz < MODEL_STRIDE or imgsz > max_imgsz:
+        raise ValueError(f"imgsz must be between {MODEL_STRIDE} and {max_imgsz}")
+    return -(-imgsz // MODEL_STRIDE) * MODEL_STRIDE
+
+
+def torch_memory_bytes(model):
+    """Bytes held by an ultralytics model's parameters and buffers"""
+    network = model.model
+    tensors = list(network.parameters()) + list(network.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class TorchBackend:
+    """Runs the ultralytics model directly (PyTorch, CPU or CUDA)"""
+
+    name = "torch"
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, images, conf, iou, class_ids=None, imgsz=None):
+        # ultralytics letterboxes each image to imgsz itself, in the same pass
+        options = {"imgsz": imgsz} if imgsz else {}
+        results = self.model(images, verbose=False, conf=conf, iou=iou,
+                             classes=list(class_ids) if class_ids is not None else None, **options)
+        return [result_arrays(result) for result in results]
+
+    def memory_bytes(self):
+        return torch_memory_bytes(self.model)
+
+    def info(self):
+        return {"backend": self.name}
+
+
+def letterbox(image, size):
+    """Resize keeping aspect ratio and pad to size x size; returns (image, ratio, (pad_x, pad_y))"""
+    height, width = image.shape[:2]
+    ratio = min(size / height, size / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    left = (size - new_width) // 2
+    top = (size - new_height) // 2
+    padded = cv2.copyMakeBorder(image, top, size - new_height - top, left, size - new_width - left,
+                                cv2.BORDER_CONSTANT, value=PAD_VALUE)
+    return padded, ratio, (left, top)
+
+
+def decode_predictions(output, conf_threshold, iou_threshold, class_ids, ratio, pad, shape, max_det=300):
+    """Raw (4 + num_classes, anchors) YOLOv8 output -> NMS-filtered (xyxy, conf, cls) in image pixels"""
+    predictions = output.T
+    scores = predictions[:, 4:]
+    cls = scores.argmax(axis=1)
+    conf = scores[np.arange(len(cls)), cls]
+
+    # Same order as ultralytics: best class first, then confidence and class filters
+    keep = conf >= conf_threshold
+    if class_ids is not None:
+        keep &= np.isin(cls, class_ids)
+    if not keep.any():
+        return empty_arrays()
+    boxes, conf, cls = predictions[keep, :4], conf[keep], cls[keep]
+
+    # Per-class NMS on (x, y, w, h) boxes
+    xywh = np.column_stack([boxes[:, 0] - boxes[:, 2] / 2, boxes[:, 1] - boxes[:, 3] / 2, boxes[:, 2], boxes[:, 3]])
+    indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), conf.tolist(), cls.tolist(), conf_threshold, iou_threshold)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:max_det]
+    if len(indices) == 0:
+        return empty_arrays()
+
+    # Undo the letterbox and clip to the original image
+    xyxy = np.column_stack([xywh[indices, 0], xywh[indices, 1],
+                            xywh[indices, 0] + xywh[indices, 2], xywh[indices, 1] + xywh[indices, 3]])
+    xyxy -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=xyxy.dtype)
+    xyxy /= ratio
+    height, width = shape
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width)
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height)
+    return xyxy.astype(np.float32), conf[indices].astype(np.float32), cls[indices].astype(np.int64)
+
+
+class ExportedBackend(abc.ABC):
+    """Shared letterbox / decode / NMS around a runtime executing an exported model"""
+
+    name = None
+
+    def __init__(self, path, imgsz=640):
+        self.path = path
+        self.imgsz = imgsz
+        self.intra_op_threads = int(os.getenv("BACKEND_INTRA_OP_THREADS", 0))
+        self.inter_op_threads = int(os.getenv("BACKEND_INTER_OP_THREADS", 0))
+
+    @abc.abstractmethod
+    def run(self, blob):
+        """Raw model output for an (N, 3, H, W) float blob"""
+
+    def predict(self, images, conf, iou, class_ids=None, imgsz=None):
+        """Letterbox every image once to imgsz (exports have dynamic axes, so any stride multiple works)"""
+        letterboxed = [letterbox(image, imgsz or self.imgsz) for image in images]
+        blob = cv2.dnn.blobFromImages([item[0] for item in letterboxed], 1 / 255.0, swapRB=True)
+        outputs = self.run(blob)
+        return [
+            decode_predictions(output, conf, iou, class_ids, ratio, pad, image.shape[:2])
+            for output, (_, ratio, pad), image in zip(outputs, letterboxed, images)
+        ]
+
+    def memory_bytes(self):
+        """Size of the exported artifact, a close proxy for the runtime's weight memory"""
+        if os.path.isdir(self.path):
+            return sum(os.path.getsize(os.path.join(self.path, f)) for f in os.listdir(self.path))
+        return os.path.getsize(self.path)
+
+    def info(self):
+        return {
+            "backend": self.name,
+            "artifact": self.path,
+            "imgsz": self.imgsz,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads
+        }
+
+
+class OnnxRuntimeBackend(ExportedBackend):
+    name = "onnx"
+
+    def __init__(self, path, imgsz=640, name=None):
+        super().__init__(path, imgsz)
+        self.name = name or self.name
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("The onnx backend needs onnxruntime (pip install onnxruntime)")
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+    def info(self):
+        info = super().info()
+        report = load_report(self.path)
+        if report is not None:
+            info["quantization"] = report
+        return info
+
+
+class OpenVinoBackend(ExportedBackend):
+    name = "openvino"
+
+    def __init__(self, path, imgsz=640):
+        super().__init__(path, imgsz)
+        try:
+            from openvino.runtime import Core
+        except ImportError:
+            raise RuntimeError("The openvino backend needs OpenVINO (pip install openvino)")
+        config = {"PERFORMANCE_HINT": "THROUGHPUT"}
+        if self.intra_op_threads:
+            config["INFERENCE_NUM_THREADS"] = str(self.intra_op_threads)
+        if self.inter_op_threads:
+            config["NUM_STREAMS"] = str(self.inter_op_threads)
+        core = Core()
+        xml = next(os.path.join(path, f) for f in os.listdir(path) if f.endswith(".xml"))
+        self.compiled = core.compile_model(core.read_model(xml), "CPU", config)
+        self.output = self.compiled.output(0)
+
+    def run(self, blob):
+        return self.compiled([blob])[self.output]
+
+
+def export_path(weights_path, backend, export_dir="models"):
+    stem = os.path.splitext(os.path.basename(weights_path))[0]
+    if backend == "onnx":
+        return os.path.join(export_dir, f"{stem}.onnx")
+    return os.path.join(export_dir, f"{stem}_openvino_model")
+
+
+def export_model(model, weights_path, backend, imgsz=640, export_dir="models"):
+    """Export once and cache the artifact in export_dir; re-exported only when the weights are newer"""
+    target = export_path(weights_path, backend, export_dir)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(weights_path):
+        return target
+
+    print(f"Exporting {weights_path} to {backend}...")
+    # Dynamic axes so several images can share one batch
+    exported = model.export(format=backend, imgsz=imgsz, dynamic=True, verbose=False)
+    exported = str(exported).rstrip("/\\")
+    if os.path.abspath(exported) != os.path.abspath(target):
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        elif os.path.exists(target):
+            os.remove(target)
+        shutil.move(exported, target)
+    print(f"Exported {backend} model cached at {target}")
+    return target
+
+
+def create_backend(backend, model, weights_path, imgsz=640):
+    """Inference backend for a loaded ultralytics model"""
+    if backend == "torch":
+        return TorchBackend(model)
+    if backend == "openvino":
+        return OpenVinoBackend(export_model(model, weights_path, backend, imgsz), imgsz)
+    path = export_model(model, weights_path, "onnx", imgsz)
+    for mode, name in QUANTIZATION_MODES.items():
+        if backend == name:
+            return OnnxRuntimeBackend(quantize_model(path, mode, imgsz), imgsz, name=name)
+    return OnnxRuntimeBackend(path, imgsz)
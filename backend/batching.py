@@ -0,0 +1,151 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-image requests into batched forward passes
+
+    Callers block in submit() while a background thread gathers everything
+    that arrives within max_wait_ms (up to max_batch_size items), runs one
+    batch_fn(images, key) call per key and fans the results back out.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=None, max_wait_ms=None, name="micro-batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size or int(os.getenv("BATCH_MAX_SIZE", 8))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv("BATCH_MAX_WAIT_MS", 5))) / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._submit_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.total_batch_time = 0.0
+        self.total_wait_time = 0.0
+        self.max_batch_seen = 0
+        self.last_batch = None
+        self._thread = None
+        if self.max_batch_size > 1:
+            self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+            self._thread.start()
+
+    def enqueue(self, image, key=None):
+        """Queue one image and return a Future for its result, or None when batching is off or closed
+
+        Lets async callers wait for the batch without holding a worker thread.
+        """
+        with self._submit_lock:
+            if self._thread is None or self._closed:
+                return None
+            future = Future()
+            self._queue.put((image, key, time.time(), future))
+            return future
+
+    def submit(self, image, key=None):
+        """Queue one image and block until its result is ready"""
+        future = self.enqueue(image, key)
+        if future is None:
+            return self._run_batch([image], key, [time.time()])[0]
+        return future.result()
+
+    def submit_many(self, images, key=None):
+        """Queue several images together (so they can share a batch) and block for all results"""
+        futures = [Future() for _ in images]
+        with self._submit_lock:
+            queued = self._thread is not None and not self._closed
+            if queued:
+                now = time.time()
+                for image, future in zip(images, futures):
+                    self._queue.put((image, key, now, future))
+        if not queued:
+            now = time.time()
+            return self._run_batch(list(images), key, [now] * len(images))
+        return [future.result() for future in futures]
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        items = [first]
+        deadline = time.time() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the sentinel back so the loop exits after this batch
+                self._queue.put(None)
+                break
+            items.append(item)
+        return items
+
+    def _loop(self):
+        while True:
+            items = self._collect()
+            if items is None:
+                break
+
+            # Requests with different inference parameters cannot share a forward pass
+            groups = {}
+            for item in items:
+                groups.setdefault(item[1], []).append(item)
+
+            for key, group in groups.items():
+                images = [item[0] for item in group]
+                futures = [item[3] for item in group]
+                try:
+                    results = self._run_batch(images, key, [item[2] for item in group])
+                    for future, result in zip(futures, results):
+                        future.set_result(result)
+                except Exception as e:
+                    for future in futures:
+                        future.set_exception(e)
+
+    def _run_batch(self, images, key, submitted_at):
+        start = time.time()
+        results = self.batch_fn(images, key)
+        elapsed = time.time() - start
+
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(images)
+            self.total_batch_time += elapsed
+            self.total_wait_time += sum(start - t for t in submitted_at)
+            self.max_batch_seen = max(self.max_batch_seen, len(images))
+            self.last_batch = {
+                "size": len(images),
+                "latency_ms": elapsed * 1000,
+                "occupancy": len(images) / self.max_batch_size
+            }
+        return results
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "enabled": self._thread is not None and not self._closed,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": self.batches,
+                "images": self.items,
+                "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+                "avg_occupancy": self.items / (self.batches * self.max_batch_size) if self.batches else 0.0,
+                "max_batch_seen": self.max_batch_seen,
+                "avg_batch_latency_ms": self.total_batch_time / self.batches * 1000 if self.batches else 0.0,
+                "avg_queue_wait_ms": self.total_wait_time / self.items * 1000 if self.items else 0.0,
+                "queued": self._queue.qsize(),
+                "last_batch": self.last_batch
+            }
+
+    def close(self):
+        """Stop accepting queued work once everything already queued has run"""
+        with self._submit_lock:
+            if self._thread is not None and not self._closed:
+                self._closed = True
+                self._queue.put(None)
@@ -0,0 +1,194 @@
+"""Micro-benchmarks for the detection backend
+
+Usage (from the backend directory):
+    python benchmark.py postprocess --boxes 10 100 500 2000 --repeat 50
+    python benchmark.py artifacts --width 1920 --height 1080 --boxes 50
+    python benchmark.py backends --model yolov8n.pt --backends torch onnx openvino --batch 1 4
+    python benchmark.py backends --model yolov8n.pt --backends onnx onnx-int8 onnx-int8-static --images samples/
+"""
+import argparse
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Boxes
+
+from backends import create_backend
+from postprocess import (result_arrays, select_class_ids, format_detections, draw_detections,
+                         ARTIFACT_MODES, save_artifacts)
+from quantization import agreement, load_images
+
+COCO_CLASSES = [f"class_{i}" for i in range(80)]
+
+
+def synthetic_result(num_boxes, width=1920, height=1080, seed=0):
+    """Fake ultralytics result holding num_boxes random boxes"""
+    rng = np.random.default_rng(seed)
+    x1 = rng.uniform(0, width - 50, num_boxes)
+    y1 = rng.uniform(0, height - 50, num_boxes)
+    x2 = x1 + rng.uniform(5, 50, num_boxes)
+    y2 = y1 + rng.uniform(5, 50, num_boxes)
+    conf = rng.uniform(0.25, 1.0, num_boxes)
+    cls = rng.integers(0, len(COCO_CLASSES), num_boxes)
+    data = torch.tensor(np.column_stack([x1, y1, x2, y2, conf, cls]), dtype=torch.float32)
+    if torch.cuda.is_available():
+        data = data.cuda()
+    return SimpleNamespace(boxes=Boxes(data, (height, width)))
+
+
+def legacy_postprocess(result, class_names, img_width, img_height, selected_classes=None):
+    """Per-box loop that YOLODetector.detect used before vectorization (drawing excluded)"""
+    detections = []
+    yolo_labels = []
+    boxes = result.boxes
+    if boxes is not None:
+        for i in range(len(boxes)):
+            x1, y1, x2, y2 = boxes.xyxy[i].cpu().numpy() if boxes.xyxy[i].is_cuda else boxes.xyxy[i].numpy()
+            conf = boxes.conf[i].cpu().item() if boxes.conf[i].is_cuda else boxes.conf[i].item()
+            cls = int(boxes.cls[i].cpu().item() if boxes.cls[i].is_cuda else boxes.cls[i].item())
+            class_name = class_names[cls] if cls < len(class_names) else f"class_{cls}"
+            if selected_classes and class_name not in selected_classes:
+                continue
+            detections.append({
+                "class": class_name,
+                "confidence": float(conf),
+                "bbox": [float(x1), float(y1), float(x2), float(y2)]
+            })
+            x_center = ((x1 + x2) / 2) / img_width
+            y_center = ((y1 + y2) / 2) / img_height
+            width = (x2 - x1) / img_width
+            height = (y2 - y1) / img_height
+            yolo_labels.append(f"{cls} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}")
+    return detections, yolo_labels
+
+
+def vectorized_postprocess(result, class_names, img_width, img_height, selected_classes=None):
+    xyxy, conf, cls = result_arrays(result)
+    return format_detections(xyxy, conf, cls, class_names, img_width, img_height,
+                             select_class_ids(class_names, selected_classes))
+
+
+def time_call(fn, repeat):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_postprocess(args):
+    width, height = 1920, 1080
+    selected = COCO_CLASSES[:args.selected] if args.selected else None
+    print(f"{'boxes':>8} {'legacy ms':>12} {'vectorized ms':>14} {'speedup':>9}")
+    for num_boxes in args.boxes:
+        result = synthetic_result(num_boxes, width, height)
+        legacy = legacy_postprocess(result, COCO_CLASSES, width, height, selected)
+        vectorized = vectorized_postprocess(result, COCO_CLASSES, width, height, selected)
+        if [d["class"] for d in legacy[0]] != [d["class"] for d in vectorized[0]]:
+            print(f"warning: detections differ for {num_boxes} boxes")
+
+        legacy_ms = time_call(lambda: legacy_postprocess(result, COCO_CLASSES, width, height, selected), args.repeat)
+        vector_ms = time_call(lambda: vectorized_postprocess(result, COCO_CLASSES, width, height, selected), args.repeat)
+        print(f"{num_boxes:>8} {legacy_ms:>12.3f} {vector_ms:>14.3f} {legacy_ms / vector_ms:>8.1f}x")
+
+
+def bench_artifacts(args):
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    xyxy, conf, cls = result_arrays(synthetic_result(args.boxes, args.width, args.height))
+    detections, yolo_labels = format_detections(xyxy, conf, cls, COCO_CLASSES, args.width, args.height)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "output.jpg")
+        labels_path = os.path.join(tmp, "labels.txt")
+
+        def request(mode):
+            # Per-request work after the forward pass, as done by /predict
+            annotated = draw_detections(image, detections) if ARTIFACT_MODES[mode][0] else None
+            save_artifacts(mode, image, annotated, yolo_labels, output_path, labels_path)
+
+        print(f"{args.width}x{args.height} image, {args.boxes} boxes")
+        print(f"{'artifacts':>10} {'ms/request':>12} {'saved vs all':>14}")
+        all_ms = time_call(lambda: request("all"), args.repeat)
+        for mode in ("all", "image", "labels", "none"):
+            ms = all_ms if mode == "all" else time_call(lambda: request(mode), args.repeat)
+            print(f"{mode:>10} {ms:>12.3f} {all_ms - ms:>13.3f}ms")
+
+
+def bench_backends(args):
+    from ultralytics import YOLO
+
+    images = load_images(args.images)
+    if not images:
+        raise SystemExit("No images found")
+    model = YOLO(args.model)
+    weights_path = model.ckpt_path or args.model
+    print(f"{args.model}, {len(images)} images, conf {args.conf}, iou {args.iou}")
+    print(f"{'backend':>10} {'imgsz':>6} {'batch':>6} {'ms/image':>10} {'images/s':>10} {'agreement':>10}")
+
+    reference = None
+    for backend_name in args.backends:
+        start = time.perf_counter()
+        try:
+            backend = create_backend(backend_name, model, weights_path)
+        except Exception as e:
+            print(f"{backend_name:>10} unavailable: {e}")
+            continue
+        setup = time.perf_counter() - start
+
+        outputs = [backend.predict([image], args.conf, args.iou)[0] for image in images]
+        if reference is None:
+            # The first backend (torch by default) is the reference for agreement
+            reference = outputs
+        score = agreement(reference, outputs)
+
+        for imgsz in args.imgsz:
+            for batch in args.batch:
+                chunks = [images[i:i + batch] for i in range(0, len(images), batch)]
+
+                def run():
+                    for chunk in chunks:
+                        backend.predict(chunk, args.conf, args.iou, imgsz=imgsz)
+
+                ms = time_call(run, args.repeat) / len(images)
+                print(f"{backend_name:>10} {imgsz:>6} {batch:>6} {ms:>10.2f} {1000 / ms:>10.1f} {score:>9.1%}")
+        print(f"{'':>10} setup (export/compile) {setup:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detection backend benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    post = subparsers.add_parser("postprocess", help="Per-box loop vs vectorized result post-processing")
+    post.add_argument("--boxes", type=int, nargs="+", default=[10, 100, 500, 1000, 3000])
+    post.add_argument("--repeat", type=int, default=50)
+    post.add_argument("--selected", type=int, default=0, help="Filter to the first N classes (0 = no filter)")
+    post.set_defaults(func=bench_postprocess)
+
+    artifacts = subparsers.add_parser("artifacts", help="Per-request cost of each /predict artifacts mode")
+    artifacts.add_argument("--width", type=int, default=1920)
+    artifacts.add_argument("--height", type=int, default=1080)
+    artifacts.add_argument("--boxes", type=int, default=50)
+    artifacts.add_argument("--repeat", type=int, default=30)
+    artifacts.set_defaults(func=bench_artifacts)
+
+    backends = subparsers.add_parser("backends", help="Inference speed and agreement of the inference backends")
+    backends.add_argument("--model", default="yolov8n.pt")
+    backends.add_argument("--backends", nargs="+", default=["torch", "onnx", "openvino"])
+    backends.add_argument("--images", default=None, help="Directory of sample images (default: ultralytics assets)")
+    backends.add_argument("--batch", type=int, nargs="+", default=[1])
+    backends.add_argument("--imgsz", type=int, nargs="+", default=[640], help="Inference sizes to time")
+    backends.add_argument("--conf", type=float, default=0.25)
+    backends.add_argument("--iou", type=float, default=0.45)
+    backends.add_argument("--repeat", type=int, default=10)
+    backends.set_defaults(func=bench_backends)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """Bounded LRU + TTL cache of detection results keyed on image content and inference parameters"""
+
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("RESULT_CACHE_SIZE", 256))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("RESULT_CACHE_MAX_MB", 64)) * 1024 * 1024
+        self.ttl = ttl if ttl is not None else float(os.getenv("RESULT_CACHE_TTL", 300))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(image, model_id, params):
+        """Hash of the decoded pixels plus everything that changes the detections"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(image.shape).encode())
+        digest.update(memoryview(image if image.flags.c_contiguous else image.copy()).cast("B"))
+        return (digest.hexdigest(), model_id, params)
+
+    @staticmethod
+    def _estimate_size(value):
+        detections, yolo_labels = value
+        return 200 * len(detections) + sum(len(line) for line in yolo_labels) + 100
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires = entry
+            if expires < time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        detections, yolo_labels = value
+        return [dict(d) for d in detections], list(yolo_labels)
+
+    def put(self, key, value):
+        size = self._estimate_size(value)
+        if not self.enabled or size > self.max_bytes:
+            return
+        detections, yolo_labels = value
+        value = ([dict(d) for d in detections], list(yolo_labels))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.time() + self.ttl)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self, instance_id=None):
+        """Drop the entries of one detector instance (e.g. an unloaded model), or everything when None"""
+        with self._lock:
+            if instance_id is None:
+                self._entries.clear()
+                self.bytes = 0
+            else:
+                for key in [key for key in self._entries if key[1][1] == instance_id]:
+                    self._remove(key)
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+
+class InferenceExecutor:
+    """Bounded worker pool that runs detector and file work off the event loop"""
+
+    def __init__(self, max_workers=None, max_queue=None):
+        self.max_workers = max_workers or int(os.getenv("INFERENCE_WORKERS", 2))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("INFERENCE_QUEUE_SIZE", 16))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_time = 0.0
+
+    def _call(self, fn, args, kwargs):
+        with self._lock:
+            self._running += 1
+        start = time.time()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.total_time += time.time() - start
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    async def submit(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool, rejecting with 503 when the queue is full
+
+        A slot is freed when fn returns (or is cancelled before it starts), not
+        when the caller stops waiting, so abandoned work still counts.
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(status_code=503, detail="Inference queue is full, please retry shortly")
+            self._pending += 1
+
+        try:
+            future = self._pool.submit(self._call, fn, args, kwargs)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_task_time": self.total_time / finished if finished else 0.0
+            }
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
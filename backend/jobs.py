@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """State of one background job; workers report progress and poll for cancellation through it"""
+
+    def __init__(self, job_id, kind):
+        self.id = job_id
+        self.kind = kind
+        self.status = "queued"
+        self.progress = 0
+        self.message = "Waiting for a worker..."
+        self.details = {}
+        self.result = None
+        self.error = None
+        self.error_status = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self):
+        return self.status in ("completed", "error", "cancelled")
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def update(self, progress=None, message=None, **details):
+        with self._lock:
+            if progress is not None:
+                self.progress = int(progress)
+            if message is not None:
+                self.message = message
+            self.details.update(details)
+
+    def to_dict(self, include_result=True):
+        with self._lock:
+            data = {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": self.progress,
+                "message": self.message,
+                **self.details,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at
+            }
+            if self.error is not None:
+                data["error"] = self.error
+            if include_result and self.result is not None:
+                data["result"] = self.result
+            return data
+
+
+class JobManager:
+    """Runs long jobs (video processing) on a bounded pool and keeps their status for polling"""
+
+    def __init__(self, max_workers=None, max_pending=None, history=None):
+        self.max_workers = max_workers or int(os.getenv("JOB_WORKERS", 1))
+        self.max_pending = max_pending if max_pending is not None else int(os.getenv("JOB_QUEUE_SIZE", 8))
+        self.history = history or int(os.getenv("JOB_HISTORY", 100))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="jobs")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, job_id=None, **kwargs):
+        """Queue fn(job, *args, **kwargs) and return the Job immediately"""
+        job = Job(job_id or str(uuid.uuid4()), kind)
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if not j.finished)
+            if active >= self.max_workers + self.max_pending:
+                raise HTTPException(status_code=503, detail="Too many jobs in progress, please retry shortly")
+            self._jobs[job.id] = job
+            self._trim()
+        job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled:
+            job.status = "cancelled"
+            job.message = "Cancelled before start"
+            job.finished_at = time.time()
+            return None
+
+        job.status = "processing"
+        job.started_at = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = "completed"
+            job.progress = 100
+        except JobCancelled:
+            job.status = "cancelled"
+            job.message = "Cancelled"
+        except HTTPException as e:
+            job.status = "error"
+            job.error = e.detail
+            job.error_status = e.status_code
+            job.message = f"Error: {e.detail}"
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            job.status = "error"
+            job.error = str(e)
+            job.error_status = 500
+            job.message = f"Error: {str(e)}"
+        finally:
+            job.finished_at = time.time()
+        return job.result
+
+    def _trim(self):
+        # Forget the oldest finished jobs beyond the history limit
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job._cancel_event.set()
+        return job
+
+    def list(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.to_dict(include_result=False) for job in jobs]
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.max_workers, "max_pending": self.max_pending, **counts}
+
+    def shutdown(self):
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,98 @@
+import cv2
+import numpy as np
+
+YOLO_LABEL_FORMAT = "%d %.6f %.6f %.6f %.6f"
+
+
+def empty_arrays():
+    return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+
+def result_arrays(result):
+    """Convert one ultralytics result to (xyxy, conf, cls) NumPy arrays with a single device transfer"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return empty_arrays()
+    data = boxes.data.cpu().numpy()
+    return data[:, :4], data[:, 4], data[:, 5].astype(np.int64)
+
+
+def class_label(class_names, cls):
+    return class_names[cls] if 0 <= cls < len(class_names) else f"class_{cls}"
+
+
+def select_class_ids(class_names, selected_classes):
+    """Map selected class names to model class ids, or None when no filter applies"""
+    if not selected_classes:
+        return None
+    wanted = set(selected_classes)
+    ids = {i for i, name in enumerate(class_names) if name in wanted}
+    # Out-of-range ids are reported as "class_N", so accept those names too
+    for name in wanted:
+        if isinstance(name, str) and name.startswith("class_") and name[6:].isdigit():
+            ids.add(int(name[6:]))
+    return np.array(sorted(ids), dtype=np.int64)
+
+
+def yolo_label_lines(xyxy, cls, img_width, img_height):
+    """YOLO format rows (class_id x_center y_center width height), normalized to the image size"""
+    if len(cls) == 0:
+        return []
+    scale = np.array([img_width, img_height], dtype=np.float64)
+    xyxy = xyxy.astype(np.float64)
+    centers = (xyxy[:, :2] + xyxy[:, 2:]) / 2 / scale
+    sizes = (xyxy[:, 2:] - xyxy[:, :2]) / scale
+    rows = np.column_stack([cls, centers, sizes]).tolist()
+    return [YOLO_LABEL_FORMAT % tuple(row) for row in rows]
+
+
+def format_detections(xyxy, conf, cls, class_names, img_width, img_height, class_ids=None):
+    """Filter by class id and build the detection dicts and YOLO labels in one pass over the arrays"""
+    if class_ids is not None:
+        mask = np.isin(cls, class_ids)
+        xyxy, conf, cls = xyxy[mask], conf[mask], cls[mask]
+
+    detections = [
+        {"class": class_label(class_names, c), "confidence": s, "bbox": box}
+        for box, s, c in zip(xyxy.astype(np.float64).tolist(), conf.astype(np.float64).tolist(), cls.tolist())
+    ]
+    return detections, yolo_label_lines(xyxy, cls, img_width, img_height)
+
+
+def draw_detections(image, detections, in_place=False):
+    """Return image (copied unless in_place) with boxes and labels drawn for each detection"""
+    annotated_image = image if in_place else image.copy()
+    for detection in detections:
+        x1, y1, x2, y2 = (int(v) for v in detection["bbox"])
+
+        # Draw bounding box and label
+        cv2.rectangle(annotated_image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+
+        # Draw label
+        label = f"{detection['class']}: {detection['confidence']:.2f}"
+        text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
+        cv2.rectangle(annotated_image, (x1, y1 - text_size[1] - 10),
+                      (x1 + text_size[0], y1), (0, 255, 0), -1)
+        cv2.putText(annotated_image, label, (x1, y1 - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
+    return annotated_image
+
+
+# Which files each artifacts mode writes for an image request
+ARTIFACT_MODES = {
+    "none": (False, False),
+    "labels": (False, True),
+    "image": (True, False),
+    "all": (True, True)
+}
+
+
+def save_artifacts(artifacts, image, annotated_image, yolo_labels, output_path, labels_path):
+    """Write the annotated image and/or YOLO labels requested by the artifacts mode"""
+    write_image, write_labels = ARTIFACT_MODES[artifacts]
+    if write_image:
+        cv2.imwrite(output_path, annotated_image if annotated_image is not None else image)
+    if write_labels:
+        with open(labels_path, 'w') as f:
+            f.write('\n'.join(yolo_labels))
+    return write_image, write_labels
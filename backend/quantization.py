@@ -0,0 +1,155 @@
+import glob
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from tracking import iou_matrix
+
+# Quantization mode -> backend name serving the INT8 model
+QUANTIZATION_MODES = {
+    "dynamic": "onnx-int8",
+    "static": "onnx-int8-static"
+}
+
+# Only the heavy layers are quantized; the detection head's box/score arithmetic stays in float
+QUANTIZED_OP_TYPES = ["Conv", "MatMul"]
+
+
+def load_images(image_dir=None, limit=None):
+    """Images from a directory, or the sample images shipped with ultralytics"""
+    if image_dir:
+        paths = sorted(p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(image_dir, f"*.{ext}")))
+    else:
+        from ultralytics.utils import ASSETS
+        paths = sorted(str(p) for p in ASSETS.glob("*.jpg"))
+    images = (cv2.imread(p) for p in paths[:limit])
+    return [image for image in images if image is not None]
+
+
+def agreement(reference, candidate, iou_threshold=0.5):
+    """Share of reference boxes matched by a same-class candidate box with IoU >= iou_threshold"""
+    matched = total = 0
+    for (ref_xyxy, _, ref_cls), (xyxy, _, cls) in zip(reference, candidate):
+        total += len(ref_cls)
+        if len(ref_cls) == 0 or len(cls) == 0:
+            continue
+        ious = iou_matrix(ref_xyxy.astype(np.float64), xyxy.astype(np.float64))
+        ious[ref_cls[:, None] != cls[None, :]] = 0.0
+        matched += int((ious.max(axis=1) >= iou_threshold).sum())
+    return matched / total if total else 1.0
+
+
+def calibration_reader(images, input_name, imgsz):
+    """ONNX Runtime calibration reader feeding letterboxed images one at a time"""
+    from onnxruntime.quantization import CalibrationDataReader
+    from backends import letterbox
+
+    class ImageReader(CalibrationDataReader):
+        def __init__(self):
+            # A generator, so only one preprocessed image is held at a time
+            self._blobs = (
+                {input_name: cv2.dnn.blobFromImage(letterbox(image, imgsz)[0], 1 / 255.0, swapRB=True)}
+                for image in images
+            )
+
+        def get_next(self):
+            return next(self._blobs, None)
+
+    return ImageReader()
+
+
+def quantized_path(onnx_path, mode):
+    return f"{os.path.splitext(onnx_path)[0]}_int8_{mode}.onnx"
+
+
+def report_path(model_path):
+    return os.path.splitext(model_path)[0] + ".json"
+
+
+def load_report(model_path):
+    path = report_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def time_per_image(backend, images, conf, iou, repeat):
+    backend.predict(images[:1], conf, iou)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for image in images:
+            backend.predict([image], conf, iou)
+    return (time.perf_counter() - start) / (repeat * len(images)) * 1000
+
+
+def evaluate(reference, quantized, images, conf=0.25, iou=0.45, repeat=None):
+    """Speed and box agreement of a quantized backend against its float reference on the same images"""
+    repeat = repeat or int(os.getenv("QUANTIZATION_EVAL_REPEAT", 3))
+    reference_ms = time_per_image(reference, images, conf, iou, repeat)
+    quantized_ms = time_per_image(quantized, images, conf, iou, repeat)
+    score = agreement([reference.predict([image], conf, iou)[0] for image in images],
+                      [quantized.predict([image], conf, iou)[0] for image in images])
+    return {
+        "images": len(images),
+        "conf": conf,
+        "float_ms_per_image": round(reference_ms, 3),
+        "int8_ms_per_image": round(quantized_ms, 3),
+        "speedup": round(reference_ms / quantized_ms, 3) if quantized_ms else None,
+        "agreement": round(score, 4),
+        "float_size_mb": round(reference.memory_bytes() / (1024 * 1024), 2),
+        "int8_size_mb": round(quantized.memory_bytes() / (1024 * 1024), 2)
+    }
+
+
+def quantize_model(onnx_path, mode, imgsz=640, calibration_dir=None):
+    """INT8 copy of an exported ONNX model, cached next to it with an accuracy/speed report
+
+    dynamic quantizes weights ahead of time and activations on the fly;
+    static also fixes activation ranges, calibrated on images from
+    calibration_dir (CALIBRATION_DIR, or the ultralytics sample images).
+    Both are re-run only when the float model is newer than the cached copy.
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"quantize must be one of: {', '.join(QUANTIZATION_MODES)}")
+    target = quantized_path(onnx_path, mode)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(onnx_path):
+        return target
+
+    try:
+        from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+    except ImportError:
+        raise RuntimeError("INT8 quantization needs onnxruntime (pip install onnxruntime)")
+    from backends import OnnxRuntimeBackend
+
+    calibration_dir = calibration_dir or os.getenv("CALIBRATION_DIR") or None
+    images = load_images(calibration_dir, limit=int(os.getenv("CALIBRATION_IMAGES", 100)))
+    if not images:
+        raise RuntimeError(f"No calibration images found in {calibration_dir}")
+
+    print(f"Quantizing {onnx_path} to INT8 ({mode})...")
+    start = time.time()
+    reference = OnnxRuntimeBackend(onnx_path, imgsz)
+    if mode == "dynamic":
+        # ConvInteger kernels on CPU take unsigned weights
+        quantize_dynamic(onnx_path, target, weight_type=QuantType.QUInt8, op_types_to_quantize=QUANTIZED_OP_TYPES)
+    else:
+        quantize_static(onnx_path, target, calibration_reader(images, reference.input_name, imgsz),
+                        quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+                        weight_type=QuantType.QInt8, op_types_to_quantize=QUANTIZED_OP_TYPES)
+    quantize_seconds = time.time() - start
+
+    # Accuracy-vs-speed numbers are measured once here and served with the model afterwards
+    report = {
+        "mode": mode,
+        "calibration_dir": calibration_dir,
+        "quantize_seconds": round(quantize_seconds, 2),
+        **evaluate(reference, OnnxRuntimeBackend(target, imgsz), images)
+    }
+    with open(report_path(target), "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Quantized model cached at {target}: {report['speedup']}x speed, {report['agreement']:.1%} agreement")
+    return target
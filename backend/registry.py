@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class ResidentModel:
+    def __init__(self, name, detector):
+        self.name = name
+        self.detector = detector
+        self.memory_bytes = detector.memory_bytes()
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.uses = 0
+
+    def to_dict(self, default_name):
+        return {
+            "name": self.name,
+            "model_path": str(self.detector.model_name),
+            "default": self.name == default_name,
+            "device": self.detector.device,
+            "backend": self.detector.backend,
+            "classes": len(self.detector.class_names),
+            "memory_mb": round(self.memory_bytes / (1024 * 1024), 2),
+            "uses": self.uses,
+            "loaded_at": self.loaded_at,
+            "last_used": self.last_used
+        }
+
+
+class ModelRegistry:
+    """Keeps several detectors loaded and evicts the least recently used beyond the limits
+
+    loader(name) builds a detector for a model name. The default model is
+    never evicted; an evicted detector is only closed, so requests still
+    holding it finish normally.
+    """
+
+    def __init__(self, loader, default_name, max_models=None, memory_budget_mb=None):
+        self.loader = loader
+        self.default_name = default_name
+        self.max_models = max_models or int(os.getenv("MAX_RESIDENT_MODELS", 3))
+        budget_mb = memory_budget_mb if memory_budget_mb is not None else float(os.getenv("MODEL_MEMORY_BUDGET_MB", 2048))
+        self.memory_budget = budget_mb * 1024 * 1024
+        self._models = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def default(self):
+        return self.get(None)
+
+    def peek(self, name=None):
+        """Resident detector for name (the default when None) without loading, or None"""
+        name = name or self.default_name
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is None:
+                return None
+            self._touch(entry)
+            return entry.detector
+
+    def _touch(self, entry):
+        self._models.move_to_end(entry.name)
+        entry.last_used = time.time()
+        entry.uses += 1
+
+    def get(self, name=None):
+        """Detector for name, loading it first when it is not resident (blocking)"""
+        name = name or self.default_name
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is not None:
+                self._touch(entry)
+                return entry.detector
+            # Concurrent requests for the same model wait for one load
+            loading = self._loading.get(name)
+            owner = loading is None
+            if owner:
+                loading = self._loading[name] = Future()
+
+        if not owner:
+            return loading.result()
+        try:
+            detector = self.loader(name)
+            self.add(name, detector)
+            loading.set_result(detector)
+            return detector
+        except Exception as e:
+            loading.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(name, None)
+
+    def add(self, name, detector, make_default=False):
+        """Make detector resident under name, replacing any detector already loaded as name"""
+        entry = ResidentModel(name, detector)
+        with self._lock:
+            replaced = self._models.pop(name, None)
+            self._models[name] = entry
+            self._touch(entry)
+            self.loads += 1
+            if make_default:
+                self.default_name = name
+            evicted = self._evict(keep=name)
+        if replaced is not None and replaced.detector is not detector:
+            replaced.detector.close()
+        for old in evicted:
+            print(f"Evicting model {old.name} ({old.memory_bytes / (1024 * 1024):.1f} MB)")
+            old.detector.close()
+        return detector
+
+    def set_default(self, name):
+        with self._lock:
+            if name not in self._models:
+                raise KeyError(name)
+            self.default_name = name
+
+    def _evict(self, keep):
+        evicted = []
+        for name in list(self._models):
+            if len(self._models) <= self.max_models and self.memory_bytes <= self.memory_budget:
+                break
+            if name in (keep, self.default_name):
+                continue
+            evicted.append(self._models.pop(name))
+            self.evictions += 1
+        return evicted
+
+    @property
+    def memory_bytes(self):
+        return sum(entry.memory_bytes for entry in self._models.values())
+
+    def resident(self):
+        with self._lock:
+            return [entry.to_dict(self.default_name) for entry in self._models.values()]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "default": self.default_name,
+                "resident": [entry.to_dict(self.default_name) for entry in self._models.values()],
+                "max_models": self.max_models,
+                "memory_mb": round(self.memory_bytes / (1024 * 1024), 2),
+                "memory_budget_mb": round(self.memory_budget / (1024 * 1024), 2),
+                "loading": list(self._loading),
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
+
+    def close(self):
+        with self._lock:
+            entries = list(self._models.values())
+            self._models.clear()
+        for entry in entries:
+            entry.detector.close()
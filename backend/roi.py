@@ -0,0 +1,112 @@
+import json
+
+import cv2
+import numpy as np
+
+ROI_COLOR = (255, 191, 0)
+
+
+def parse_roi(value):
+    """Polygons from a JSON string or list: one polygon [[x, y], ...] or a list of them
+
+    Coordinates are pixels, or fractions of the frame size when every value is
+    within 0-1, so one ROI can serve a stream whatever its resolution.
+    """
+    if value is None or value == "":
+        return None
+    polygons = json.loads(value) if isinstance(value, str) else value
+    if not isinstance(polygons, list) or not polygons:
+        raise ValueError("roi must be a polygon or a list of polygons")
+    if all(isinstance(point, (list, tuple)) and len(point) == 2 and not isinstance(point[0], (list, tuple))
+           for point in polygons):
+        polygons = [polygons]
+    parsed = []
+    for polygon in polygons:
+        points = np.asarray(polygon, dtype=np.float64)
+        if points.ndim != 2 or points.shape[1] != 2 or len(points) < 3:
+            raise ValueError("each roi polygon needs at least 3 [x, y] points")
+        parsed.append(points)
+    return parsed
+
+
+def points_in_polygon(points, polygon):
+    """Boolean mask of the (N, 2) points inside the polygon (ray casting, vectorized over points)"""
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return (crosses & (x < x_cross)).sum(axis=1) % 2 == 1
+
+
+class RegionOfInterest:
+    """Crop-before-infer and polygon filtering for a fixed camera
+
+    crop() hands the detector only the bounding box of the polygons (a view,
+    no copy); restore() moves the boxes back to frame coordinates and keeps
+    those whose center lies inside a polygon. Pixel geometry is computed once
+    per frame size.
+    """
+
+    def __init__(self, polygons):
+        self.polygons = polygons
+        self.normalized = all(points.max() <= 1.0 for points in polygons)
+        # (frame size, pixel polygons, crop box), replaced as a whole so concurrent readers see one frame size
+        self._geometry = None
+
+    def _prepare(self, shape):
+        size = tuple(shape[:2])
+        geometry = self._geometry
+        if geometry is not None and geometry[0] == size:
+            return geometry
+        height, width = size
+        scale = np.array([width, height], dtype=np.float64) if self.normalized else np.ones(2)
+        pixel_polygons = [points * scale for points in self.polygons]
+        corners = np.concatenate(pixel_polygons)
+        x1, y1 = np.floor(corners.min(axis=0)).astype(int)
+        x2, y2 = np.ceil(corners.max(axis=0)).astype(int)
+        x1, x2 = np.clip([x1, x2], 0, width)
+        y1, y2 = np.clip([y1, y2], 0, height)
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError(f"roi lies outside the {width}x{height} frame")
+        geometry = self._geometry = (size, pixel_polygons, (int(x1), int(y1), int(x2), int(y2)))
+        return geometry
+
+    def check(self, shape):
+        """Raise ValueError when the polygons do not overlap a frame of this shape"""
+        self._prepare(shape)
+
+    def crop(self, frame):
+        """The part of frame the polygons cover"""
+        x1, y1, x2, y2 = self._prepare(frame.shape)[2]
+        return frame[y1:y2, x1:x2]
+
+    def restore(self, detections, frame_shape):
+        """Detections on the crop -> frame coordinates, without those outside every polygon"""
+        _, pixel_polygons, (x1, y1, _, _) = self._prepare(frame_shape)
+        if not detections:
+            return detections
+        boxes = np.array([detection["bbox"] for detection in detections], dtype=np.float64)
+        boxes += [x1, y1, x1, y1]
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        inside = np.zeros(len(boxes), dtype=bool)
+        for polygon in pixel_polygons:
+            inside |= points_in_polygon(centers, polygon)
+        return [
+            {**detection, "bbox": box}
+            for detection, box, keep in zip(detections, boxes.tolist(), inside) if keep
+        ]
+
+    def draw(self, frame):
+        """Outline the polygons on frame in place"""
+        polygons = [np.round(points).astype(np.int32) for points in self._prepare(frame.shape)[1]]
+        cv2.polylines(frame, polygons, isClosed=True, color=ROI_COLOR, thickness=2)
+        return frame
+
+    def to_dict(self):
+        return {
+            "polygons": [points.tolist() for points in self.polygons],
+            "normalized": self.normalized,
+            "crop": list(self._geometry[2]) if self._geometry else None
+        }
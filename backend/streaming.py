@@ -0,0 +1,76 @@
+import asyncio
+import json
+import os
+import threading
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream"
+}
+
+
+def format_event(event, stream_format):
+    data = json.dumps(event)
+    if stream_format == "sse":
+        return f"event: {event.get('type', 'message')}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+class EventStream:
+    """Bridges events published from a worker thread to an async streaming response
+
+    At most max_buffer events wait to be sent; publish() blocks the worker
+    beyond that, so a slow client slows processing instead of growing memory.
+    With drop_when_full (live feeds) the new event is dropped instead.
+    Once the client goes away the stream is closed and publish() returns False.
+    """
+
+    def __init__(self, loop=None, max_buffer=None, drop_when_full=False):
+        self.loop = loop or asyncio.get_running_loop()
+        self.max_buffer = max_buffer or int(os.getenv("STREAM_BUFFER_EVENTS", 64))
+        self.drop_when_full = drop_when_full
+        self._queue = asyncio.Queue()
+        self._slots = threading.Semaphore(self.max_buffer)
+        self._closed = threading.Event()
+        self.sent = 0
+        self.dropped = 0
+
+    @property
+    def closed(self):
+        return self._closed.is_set()
+
+    def publish(self, event):
+        """Called from worker threads; returns False once the client has gone away"""
+        if self.drop_when_full:
+            if not self._slots.acquire(blocking=False):
+                self.dropped += 1
+                return not self._closed.is_set()
+        else:
+            while not self._slots.acquire(timeout=0.1):
+                if self._closed.is_set():
+                    return False
+        if self._closed.is_set():
+            return False
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, event)
+        return True
+
+    def finish(self, event=None):
+        """Send a final event (if any) and end the stream"""
+        if event is not None:
+            self.publish(event)
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, None)
+
+    def close(self):
+        self._closed.set()
+
+    async def iter_formatted(self, stream_format):
+        try:
+            while True:
+                event = await self._queue.get()
+                if event is None:
+                    break
+                self._slots.release()
+                self.sent += 1
+                yield format_event(event, stream_format)
+        finally:
+            self.close()
@@ -0,0 +1,397 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+import cv2
+from fastapi import HTTPException
+
+
+class LatestFrameReader:
+    """Reads a capture on its own thread and keeps only the newest frame
+
+    Frames that arrive while the detector is busy overwrite the previous one,
+    so detection always runs on the most recent picture instead of falling
+    behind a growing backlog.
+    """
+
+    def __init__(self, url, on_frame=None, reconnect_delay=None):
+        self.url = url
+        self.on_frame = on_frame
+        self.reconnect_delay = reconnect_delay if reconnect_delay is not None else float(
+            os.getenv("STREAM_RECONNECT_DELAY", 2.0))
+        self.status = "connecting"
+        self.error = None
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.reconnects = 0
+        # (height, width) as reported by the capture, then as actually read
+        self.frame_shape = None
+        self._frame = None
+        self._frame_index = -1
+        self._captured_at = None
+        self._consumed_index = -1
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Open the capture up front so a bad URL fails the request, then read in the background"""
+        cap = cv2.VideoCapture(self.url)
+        if not cap.isOpened():
+            cap.release()
+            raise HTTPException(status_code=400, detail="Could not open stream. Check the URL and network.")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if width > 0 and height > 0:
+            self.frame_shape = (height, width)
+        self._thread = threading.Thread(target=self._run, args=(cap,), name="stream-reader", daemon=True)
+        self._thread.start()
+
+    def _run(self, cap):
+        try:
+            while not self._stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    # Stream hiccup: reconnect instead of ending the session
+                    cap.release()
+                    self.status = "reconnecting"
+                    if self._stop.wait(self.reconnect_delay):
+                        break
+                    cap = cv2.VideoCapture(self.url)
+                    self.reconnects += 1
+                    continue
+                self.status = "running"
+                with self._lock:
+                    if self._frame_index > self._consumed_index:
+                        self.frames_dropped += 1
+                    self._frame = frame
+                    self.frame_shape = frame.shape[:2]
+                    self._frame_index += 1
+                    self._captured_at = time.time()
+                    self.frames_read += 1
+                if self.on_frame:
+                    self.on_frame()
+        except Exception as e:
+            print(f"Stream reader for {self.url} failed: {e}")
+            self.error = str(e)
+            self.status = "error"
+        finally:
+            cap.release()
+
+    @property
+    def has_new_frame(self):
+        return self._frame_index > self._consumed_index
+
+    @property
+    def latest_index(self):
+        return self._frame_index
+
+    def take(self):
+        """The newest frame not yet taken as (index, frame, captured_at), or None"""
+        with self._lock:
+            if self._frame_index <= self._consumed_index:
+                return None
+            self._consumed_index = self._frame_index
+            return self._frame_index, self._frame, self._captured_at
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.reconnect_delay + 1)
+
+    def stats(self):
+        return {
+            "status": self.status,
+            "frames_read": self.frames_read,
+            "frames_dropped": self.frames_dropped,
+            "reconnects": self.reconnects
+        }
+
+
+class StreamSession:
+    """A live stream kept open between calls; the scheduler runs its detections within an FPS budget"""
+
+    def __init__(self, session_id, url, detect_options=None, detect_fps=None, model_name=None, on_frame=None,
+                 roi=None):
+        self.id = session_id
+        self.url = url
+        self.model_name = model_name
+        # Only this part of the frame is analyzed; replaced as a whole, so a running batch keeps its own
+        self.roi = roi
+        self.detect_options = detect_options or {}
+        self.detect_fps = detect_fps if detect_fps else float(os.getenv("STREAM_DETECT_FPS", 5.0))
+        self.interval = 1.0 / self.detect_fps
+        self.options_key = json.dumps([model_name, self.detect_options], sort_keys=True)
+        self.reader = LatestFrameReader(url, on_frame=on_frame)
+        self.created_at = time.time()
+        self.next_due = self.created_at
+        self.in_flight = False
+        self.stopped = False
+        self.frames_processed = 0
+        self.total_detections = 0
+        self.last_result = None
+        self.error = None
+        self.detect_time = 0.0
+        self.total_lag = 0.0
+        self.last_lag = None
+        self.frames_behind = 0
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def set_roi(self, roi):
+        """Replace the region of interest, rejecting one that cannot overlap the stream's frames"""
+        if roi is not None and self.reader.frame_shape is not None:
+            try:
+                roi.check(self.reader.frame_shape)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid roi: {str(e)}")
+        self.roi = roi
+
+    def deliver(self, index, captured_at, detections, detect_seconds, batch_size):
+        """Record one scheduled detection and fan it out to subscribers"""
+        now = time.time()
+        lag = now - captured_at
+        self.frames_processed += 1
+        self.total_detections += len(detections)
+        self.detect_time += detect_seconds
+        self.total_lag += lag
+        self.last_lag = lag
+        # Frames the camera produced while this one was being analyzed
+        self.frames_behind = self.reader.latest_index - index
+        record = {
+            "type": "frame",
+            "frame": self.frames_processed - 1,
+            "source_frame": index,
+            "timestamp": now,
+            "lag_ms": round(lag * 1000, 2),
+            "batch_size": batch_size,
+            "detections": detections
+        }
+        self.last_result = record
+        self.publish(record)
+
+    def fail(self, message):
+        self.error = message
+        self.publish({"type": "error", "message": message})
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            if not events.publish(event):
+                self.unsubscribe(events)
+
+    def subscribe(self, events):
+        with self._lock:
+            self._subscribers.append(events)
+        if self.last_result is not None:
+            events.publish(self.last_result)
+
+    def unsubscribe(self, events):
+        with self._lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+
+    def stop(self):
+        self.stopped = True
+        self.reader.stop()
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for events in subscribers:
+            events.finish({"type": "end", "session_id": self.id, "frames_processed": self.frames_processed})
+
+    def to_dict(self, include_result=False):
+        elapsed = time.time() - self.created_at
+        data = {
+            "session_id": self.id,
+            "stream_url": self.url,
+            "model_name": self.model_name,
+            "detect_fps": self.detect_fps,
+            "achieved_fps": self.frames_processed / elapsed if elapsed > 0 else 0.0,
+            "parameters": self.detect_options,
+            "roi": self.roi.to_dict() if self.roi is not None else None,
+            "frames_processed": self.frames_processed,
+            "total_detections": self.total_detections,
+            "avg_detect_ms": self.detect_time / self.frames_processed * 1000 if self.frames_processed else 0.0,
+            "lag_ms": round(self.last_lag * 1000, 2) if self.last_lag is not None else None,
+            "avg_lag_ms": self.total_lag / self.frames_processed * 1000 if self.frames_processed else 0.0,
+            "frames_behind": self.frames_behind,
+            "frames_dropped": self.reader.frames_dropped,
+            "subscribers": len(self._subscribers),
+            "reader": self.reader.stats(),
+            "created_at": self.created_at
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        if include_result:
+            data["last_result"] = self.last_result
+        return data
+
+
+class StreamSessionManager:
+    """Multiplexes live stream sessions onto a few shared detection workers
+
+    Every session has its own reader thread, but detection is scheduled
+    centrally: a worker takes the most overdue sessions that have a fresh
+    frame and are within their FPS budget, up to max_batch of them sharing
+    the same model and options, and runs them through
+    detect_fn(frames, options, model_name) as one batch. Frames a session could not keep up with are dropped, not queued.
+    """
+
+    def __init__(self, detect_fn, max_sessions=None, workers=None, max_batch=None):
+        self.detect_fn = detect_fn
+        self.max_sessions = max_sessions or int(os.getenv("STREAM_MAX_SESSIONS", 4))
+        self.workers = workers or int(os.getenv("STREAM_SCHEDULER_WORKERS", 1))
+        self.max_batch = max_batch or int(os.getenv("STREAM_BATCH_SIZE", 8))
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._threads = []
+        self.batches = 0
+        self.frames = 0
+
+    def _notify(self):
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"stream-scheduler-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_batch(self):
+        """Claim due sessions with a fresh frame; returns (sessions, timeout until the next one is due)"""
+        now = time.time()
+        ready = [s for s in self._sessions.values()
+                 if not s.in_flight and s.next_due <= now and s.reader.has_new_frame]
+        if not ready:
+            waiting = [s.next_due - now for s in self._sessions.values() if not s.in_flight]
+            due_soon = [delay for delay in waiting if delay > 0]
+            return [], min(due_soon) if due_soon else 0.1
+
+        # Most overdue first keeps cameras fair when the model cannot keep up with every budget
+        ready.sort(key=lambda s: s.next_due)
+        options_key = ready[0].options_key
+        batch = [s for s in ready if s.options_key == options_key][:self.max_batch]
+        for session in batch:
+            session.in_flight = True
+            # Budgets do not accumulate while a session waits, so it never bursts to catch up
+            session.next_due = max(session.next_due + session.interval, now)
+        return batch, 0
+
+    def _work(self):
+        while not self._stop.is_set():
+            with self._wakeup:
+                batch, timeout = self._next_batch()
+                if not batch:
+                    self._wakeup.wait(timeout=min(timeout, 0.1))
+                    continue
+
+            try:
+                self._run_batch(batch)
+            finally:
+                with self._wakeup:
+                    for session in batch:
+                        session.in_flight = False
+                    self._wakeup.notify_all()
+
+    def _run_batch(self, batch):
+        """Detect on the claimed sessions' latest frames; a session's own error fails only that session"""
+        scheduled = []
+        images = []
+        for session in batch:
+            taken = session.reader.take()
+            if taken is None:
+                continue
+            roi = session.roi
+            try:
+                # Sessions with a region of interest only send its bounding box to the model
+                images.append(roi.crop(taken[1]) if roi is not None else taken[1])
+            except ValueError as e:
+                session.fail(f"Invalid roi: {str(e)}")
+                continue
+            scheduled.append((session, taken, roi))
+        if not scheduled:
+            return
+
+        start = time.time()
+        try:
+            results = self.detect_fn(images, batch[0].detect_options, batch[0].model_name)
+        except Exception as e:
+            print(f"Stream scheduler batch failed: {e}")
+            for session, _, _ in scheduled:
+                session.fail(getattr(e, "detail", str(e)))
+            return
+        elapsed = time.time() - start
+        self.batches += 1
+        self.frames += len(scheduled)
+        for (session, (index, frame, captured_at), roi), detections in zip(scheduled, results):
+            try:
+                if roi is not None:
+                    detections = roi.restore(detections, frame.shape)
+                session.deliver(index, captured_at, detections, elapsed, len(scheduled))
+            except Exception as e:
+                print(f"Stream session {session.id} failed: {e}")
+                session.fail(str(e))
+
+    def start(self, url, detect_options=None, detect_fps=None, model_name=None, roi=None):
+        """Open the stream and schedule it; blocks until the capture is open"""
+        if self._stop.is_set():
+            raise HTTPException(status_code=503, detail="Server is shutting down")
+        session = StreamSession(str(uuid.uuid4()), url, detect_options, detect_fps, model_name,
+                                on_frame=self._notify, roi=roi)
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise HTTPException(status_code=503, detail="Too many stream sessions, stop one first")
+            self._sessions[session.id] = session
+            self._ensure_workers()
+        try:
+            session.reader.start()
+            # An ROI that cannot overlap the stream is rejected before any detection runs
+            session.set_roi(roi)
+        except Exception:
+            session.reader.stop()
+            with self._lock:
+                self._sessions.pop(session.id, None)
+            raise
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def stop(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.stop()
+        return session
+
+    def list(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return [session.to_dict() for session in sessions]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "workers": self.workers,
+                "max_batch": self.max_batch,
+                "batches": self.batches,
+                "avg_batch_size": self.frames / self.batches if self.batches else 0.0,
+                "frames_dropped": sum(s.reader.frames_dropped for s in self._sessions.values())
+            }
+
+    def shutdown(self):
+        self._stop.set()
+        self._notify()
+        for session_id in list(self._sessions):
+            self.stop(session_id)
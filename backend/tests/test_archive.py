@@ -0,0 +1,43 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from archive import CHUNK_SIZE, iter_archive, iter_tar, iter_zip
+
+
+@pytest.fixture
+def results_dir(tmp_path):
+    (tmp_path / "labels").mkdir()
+    (tmp_path / "image.jpg").write_bytes(bytes(range(256)) * 1000)
+    (tmp_path / "labels" / "image.txt").write_text("0 0.5 0.5 0.2 0.2\n")
+    (tmp_path / "empty.txt").write_bytes(b"")
+    return tmp_path
+
+
+def test_zip_is_valid(results_dir):
+    chunks = list(iter_zip(results_dir, {"results.json": b'{"ok": true}'}))
+    assert all(chunks)
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.testzip() is None
+    assert archive.namelist() == ["empty.txt", "image.jpg", "labels/image.txt", "results.json"]
+    assert archive.read("image.jpg") == (results_dir / "image.jpg").read_bytes()
+    assert archive.getinfo("image.jpg").compress_type == zipfile.ZIP_STORED
+    assert archive.read("results.json") == b'{"ok": true}'
+
+
+def test_tar_is_valid_and_streamed_in_chunks(results_dir):
+    chunks = list(iter_tar(results_dir, {"results.json": b'{"ok": true}'}))
+    assert all(chunks)
+    assert max(len(chunk) for chunk in chunks) <= CHUNK_SIZE
+    archive = tarfile.open(fileobj=io.BytesIO(b"".join(chunks)))
+    assert archive.getnames() == ["empty.txt", "image.jpg", "labels/image.txt", "results.json"]
+    assert archive.extractfile("image.jpg").read() == (results_dir / "image.jpg").read_bytes()
+    assert archive.extractfile("empty.txt").read() == b""
+    assert archive.extractfile("results.json").read() == b'{"ok": true}'
+
+
+def test_iter_archive_formats(results_dir):
+    assert zipfile.is_zipfile(io.BytesIO(b"".join(iter_archive(results_dir, "zip"))))
+    tarfile.open(fileobj=io.BytesIO(b"".join(iter_archive(results_dir, "tar")))).getmembers()
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from backends import ExportedBackend, PAD_VALUE, decode_predictions, letterbox, split_model_name
+from postprocess import format_detections
+
+
+def raw_output(candidates, num_classes=3):
+    """YOLOv8-style (4 + num_classes, anchors) output from (cx, cy, w, h, class, score) rows"""
+    output = np.zeros((4 + num_classes, len(candidates)), dtype=np.float32)
+    for i, (cx, cy, w, h, cls, score) in enumerate(candidates):
+        output[:4, i] = [cx, cy, w, h]
+        output[4 + cls, i] = score
+    return output
+
+
+def test_letterbox_keeps_aspect_ratio_and_centers_the_image():
+    image = np.full((100, 200, 3), 255, dtype=np.uint8)
+    padded, ratio, (left, top) = letterbox(image, 64)
+    assert padded.shape == (64, 64, 3)
+    assert ratio == pytest.approx(0.32)
+    assert (left, top) == (0, 16)
+    assert (padded[:16] == PAD_VALUE).all() and (padded[48:] == PAD_VALUE).all()
+    assert (padded[16:48] == 255).all()
+
+
+def test_letterbox_without_resize():
+    image = np.zeros((64, 32, 3), dtype=np.uint8)
+    padded, ratio, pad = letterbox(image, 64)
+    assert ratio == 1.0 and pad == (16, 0)
+    assert (padded[:, 16:48] == 0).all()
+
+
+def test_decode_keeps_arrays_aligned_after_nms():
+    output = raw_output([
+        (50, 50, 20, 20, 0, 0.9),
+        (51, 50, 20, 20, 0, 0.8),   # suppressed by the first box
+        (150, 150, 30, 30, 2, 0.7),
+        (52, 50, 20, 20, 1, 0.6),   # same place, other class: kept
+        (300, 300, 20, 20, 1, 0.1)  # below conf
+    ])
+    xyxy, conf, cls = decode_predictions(output, 0.25, 0.45, None, 1.0, (0, 0), (640, 640))
+    assert len(xyxy) == len(conf) == len(cls) == 3
+    rows = sorted(zip(cls.tolist(), conf.tolist(), xyxy.tolist()))
+    assert [(c, round(s, 2)) for c, s, _ in rows] == [(0, 0.9), (1, 0.6), (2, 0.7)]
+    assert rows[0][2] == [40, 40, 60, 60]
+    assert rows[2][2] == [135, 135, 165, 165]
+    # The post-processing downstream accepts them as they are
+    detections, labels = format_detections(xyxy, conf, cls, ["a", "b", "c"], 640, 640)
+    assert len(detections) == len(labels) == 3
+
+
+def test_decode_filters_classes_and_undoes_the_letterbox():
+    output = raw_output([(32, 32, 16, 16, 0, 0.9), (10, 30, 8, 8, 1, 0.8)])
+    # 200x100 image letterboxed to 64: ratio 0.32, padded 16 px top and bottom
+    xyxy, conf, cls = decode_predictions(output, 0.25, 0.45, np.array([0]), 0.32, (0, 16), (100, 200))
+    assert cls.tolist() == [0]
+    assert np.allclose(xyxy, [[75, 25, 125, 75]])
+    assert conf.dtype == np.float32 and cls.dtype == np.int64
+
+
+def test_decode_clips_and_limits():
+    output = raw_output([(5, 5, 20, 20, 0, 0.9)] + [(100 * i, 300, 10, 10, 1, 0.5) for i in range(1, 6)])
+    xyxy, conf, cls = decode_predictions(output, 0.25, 0.45, None, 1.0, (0, 0), (480, 640), max_det=3)
+    assert len(xyxy) == len(conf) == len(cls) == 3
+    assert xyxy[0].tolist() == [0, 0, 15, 15]
+    empty = decode_predictions(output, 0.95, 0.45, None, 1.0, (0, 0), (480, 640))
+    assert all(len(array) == 0 for array in empty)
+
+
+def test_exported_backend_runs_the_subclass_runtime():
+    with pytest.raises(TypeError):
+        ExportedBackend("model.onnx")
+
+    class FakeRuntime(ExportedBackend):
+        name = "fake"
+
+        def run(self, blob):
+            assert blob.shape == (2, 3, 64, 64)
+            return np.stack([raw_output([(32, 32, 16, 16, 0, 0.9)])] * len(blob))
+
+    images = [np.zeros((64, 64, 3), dtype=np.uint8), np.zeros((32, 64, 3), dtype=np.uint8)]
+    results = FakeRuntime("model.onnx", imgsz=64).predict(images, 0.25, 0.45)
+    assert np.allclose(results[0][0], [[24, 24, 40, 40]])
+    # The second image was padded 16 px top and bottom
+    assert np.allclose(results[1][0], [[24, 8, 40, 24]])
+
+
+def test_split_model_name():
+    assert split_model_name("yolov8n.pt@onnx") == ("yolov8n.pt", "onnx")
+    assert split_model_name("yolov8n.pt", "openvino") == ("yolov8n.pt", "openvino")
+    with pytest.raises(ValueError):
+        split_model_name("yolov8n.pt@tensorrt")
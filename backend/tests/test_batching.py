@@ -0,0 +1,101 @@
+import asyncio
+import threading
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def test_groups_by_key():
+    calls = []
+
+    def batch_fn(images, key):
+        calls.append((key, list(images)))
+        return [f"{key}:{image}" for image in images]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=200)
+    results = {}
+
+    def submit(image, key):
+        results[image] = batcher.submit(image, key)
+
+    threads = [threading.Thread(target=submit, args=(image, key))
+               for image, key in [(1, "a"), (2, "b"), (3, "a"), (4, "b")]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert results == {1: "a:1", 2: "b:2", 3: "a:3", 4: "b:4"}
+    # Every forward pass saw a single key
+    for key, images in calls:
+        assert all(results[image].startswith(f"{key}:") for image in images)
+    assert batcher.stats()["images"] == 4
+
+
+def test_submit_many_shares_a_batch():
+    sizes = []
+
+    def batch_fn(images, key):
+        sizes.append(len(images))
+        return [image * 2 for image in images]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=50)
+    assert batcher.submit_many([1, 2, 3], key="k") == [2, 4, 6]
+    batcher.close()
+    assert sizes == [3]
+
+
+def test_exception_fans_out_to_every_caller():
+    def batch_fn(images, key):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=50)
+    errors = []
+
+    def submit(image):
+        try:
+            batcher.submit(image)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+    assert errors == ["model failed"] * 3
+
+
+def test_runs_inline_when_disabled_or_closed():
+    batcher = MicroBatcher(lambda images, key: [image + 1 for image in images], max_batch_size=1)
+    assert batcher.submit(1) == 2
+    assert not batcher.stats()["enabled"]
+
+    batcher = MicroBatcher(lambda images, key: [image + 1 for image in images], max_batch_size=4, max_wait_ms=1)
+    batcher.close()
+    assert batcher.submit_many([1, 2]) == [2, 3]
+
+    failing = MicroBatcher(lambda images, key: 1 / 0, max_batch_size=1)
+    with pytest.raises(ZeroDivisionError):
+        failing.submit(1)
+
+
+def test_enqueue_lets_async_callers_share_a_batch():
+    sizes = []
+
+    def batch_fn(images, key):
+        sizes.append(len(images))
+        return [image * 2 for image in images]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+
+    async def main():
+        return await asyncio.gather(*(asyncio.wrap_future(batcher.enqueue(i)) for i in range(5)))
+
+    assert asyncio.run(main()) == [0, 2, 4, 6, 8]
+    assert sizes == [5]
+    batcher.close()
+    assert batcher.enqueue(1) is None
@@ -0,0 +1,62 @@
+import numpy as np
+
+from cache import ResultCache
+
+
+def value(label):
+    return [{"class": label, "confidence": 0.9, "bbox": [0, 0, 1, 1]}], [f"0 0.5 0.5 1 1 {label}"]
+
+
+def test_key_depends_on_pixels_model_and_params():
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+    other = image.copy()
+    other[0, 0, 0] = 1
+    key = ResultCache.make_key(image, ("yolov8n", 1), (0.25,))
+    assert key == ResultCache.make_key(image.copy(), ("yolov8n", 1), (0.25,))
+    assert key != ResultCache.make_key(other, ("yolov8n", 1), (0.25,))
+    assert key != ResultCache.make_key(image, ("yolov8n", 2), (0.25,))
+    assert key != ResultCache.make_key(image, ("yolov8n", 1), (0.5,))
+    # Non-contiguous views hash like their contents
+    assert ResultCache.make_key(image[:, ::2], "m", ()) == ResultCache.make_key(image[:, ::2].copy(), "m", ())
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_entries=2, max_bytes=1024 * 1024, ttl=60)
+    cache.put("a", value("a"))
+    cache.put("b", value("b"))
+    assert cache.get("a") is not None  # "a" is now the most recently used
+    cache.put("c", value("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("cache.time.time", lambda: now[0])
+    cache = ResultCache(max_entries=4, max_bytes=1024 * 1024, ttl=10)
+    cache.put("a", value("a"))
+    now[0] += 9
+    assert cache.get("a") is not None
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
+
+
+def test_returns_copies():
+    cache = ResultCache(max_entries=4, max_bytes=1024 * 1024, ttl=60)
+    cache.put("a", value("a"))
+    detections, _ = cache.get("a")
+    detections[0]["class"] = "changed"
+    assert cache.get("a")[0][0]["class"] == "a"
+
+
+def test_clear_by_instance():
+    cache = ResultCache(max_entries=8, max_bytes=1024 * 1024, ttl=60)
+    cache.put(("d1", ("yolov8n", 1), ()), value("a"))
+    cache.put(("d2", ("yolov8n", 2), ()), value("b"))
+    cache.clear(1)
+    assert cache.get(("d1", ("yolov8n", 1), ())) is None
+    assert cache.get(("d2", ("yolov8n", 2), ())) is not None
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
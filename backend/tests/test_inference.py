@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from inference import InferenceExecutor
+
+
+def test_runs_on_the_pool_and_counts_results():
+    executor = InferenceExecutor(max_workers=2, max_queue=0)
+
+    async def main():
+        assert await executor.submit(lambda a, b=0: a + b, 1, b=2) == 3
+        with pytest.raises(ZeroDivisionError):
+            await executor.submit(lambda: 1 / 0)
+
+    asyncio.run(main())
+    stats = executor.stats()
+    assert (stats["completed"], stats["failed"], stats["running"], stats["queued"]) == (1, 1, 0, 0)
+    executor.shutdown()
+
+
+def test_rejects_beyond_workers_plus_queue():
+    executor = InferenceExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def main():
+        tasks = [asyncio.ensure_future(executor.submit(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as error:
+            await executor.submit(lambda: None)
+        assert error.value.status_code == 503
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert executor.stats()["rejected"] == 1
+    executor.shutdown()
+
+
+def test_cancelled_caller_keeps_the_slot_until_the_work_returns():
+    executor = InferenceExecutor(max_workers=1, max_queue=0)
+    started = threading.Event()
+    release = threading.Event()
+
+    def read_stream():
+        started.set()
+        release.wait(5)
+
+    async def main():
+        reader = asyncio.ensure_future(executor.submit(read_stream))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        reader.cancel()
+        await asyncio.sleep(0.05)
+        # The thread is still busy, so a new stream is turned away instead of queueing behind it
+        with pytest.raises(HTTPException):
+            await executor.submit(lambda: None)
+        release.set()
+        await asyncio.sleep(0.05)
+        assert await executor.submit(lambda: "free") == "free"
+
+    asyncio.run(main())
+    executor.shutdown()
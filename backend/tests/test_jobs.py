@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from jobs import JobManager
+
+
+def wait(job):
+    job.future.result(timeout=5)
+    return job
+
+
+def test_completed_job_keeps_its_result():
+    manager = JobManager(max_workers=1, max_pending=1)
+    job = wait(manager.submit("video", lambda job, value: value * 2, 21))
+    assert job.status == "completed" and job.progress == 100
+    assert job.to_dict()["result"] == 42
+    assert "result" not in job.to_dict(include_result=False)
+    manager.shutdown()
+
+
+def test_cancel_while_running():
+    manager = JobManager(max_workers=1, max_pending=1)
+    started = threading.Event()
+    frames = []
+
+    def work(job):
+        started.set()
+        while True:
+            job.check_cancelled()
+            frames.append(len(frames))
+            job.update(len(frames) % 100, f"frame {len(frames)}")
+            time.sleep(0.01)
+
+    job = manager.submit("video", work)
+    assert started.wait(5)
+    assert manager.cancel(job.id) is job
+    wait(job)
+    assert job.status == "cancelled" and job.finished_at is not None
+    assert frames
+    manager.shutdown()
+
+
+def test_cancel_before_start():
+    manager = JobManager(max_workers=1, max_pending=2)
+    release = threading.Event()
+    ran = []
+    blocker = manager.submit("video", lambda job: release.wait(5))
+    queued = manager.submit("video", lambda job: ran.append(job.id))
+    manager.cancel(queued.id)
+    release.set()
+    wait(blocker)
+    wait(queued)
+    assert queued.status == "cancelled" and queued.message == "Cancelled before start"
+    assert ran == []
+    assert manager.cancel("missing") is None
+    manager.shutdown()
+
+
+def test_errors_keep_their_status():
+    manager = JobManager(max_workers=1, max_pending=1)
+
+    def bad_request(job):
+        raise HTTPException(status_code=400, detail="Invalid video file")
+
+    job = wait(manager.submit("video", bad_request))
+    assert (job.status, job.error, job.error_status) == ("error", "Invalid video file", 400)
+    job = wait(manager.submit("video", lambda job: 1 / 0))
+    assert job.status == "error" and job.error_status == 500
+    manager.shutdown()
+
+
+def test_rejects_when_full_and_trims_history():
+    manager = JobManager(max_workers=1, max_pending=1, history=1)
+    release = threading.Event()
+    jobs = [manager.submit("video", lambda job: release.wait(5)) for _ in range(2)]
+    with pytest.raises(HTTPException) as error:
+        manager.submit("video", lambda job: None)
+    assert error.value.status_code == 503
+    release.set()
+    for job in jobs:
+        wait(job)
+    manager.submit("video", lambda job: None, job_id="last")
+    # Only the newest finished job (and the unfinished one just queued) are kept
+    assert [job["job_id"] for job in manager.list()] == [jobs[1].id, "last"]
+    manager.shutdown()
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from postprocess import (empty_arrays, format_detections, result_arrays, select_class_ids,
+                         yolo_label_lines)
+
+CLASS_NAMES = ["person", "bicycle", "car", "dog"]
+
+
+class FakeTensor:
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class FakeBoxes:
+    def __init__(self, data):
+        self.data = FakeTensor(data)
+
+    def __len__(self):
+        return len(self.data.array)
+
+
+def random_boxes(num_boxes, num_classes=6, width=1280, height=720, seed=0):
+    """(N, 6) float32 rows like ultralytics boxes.data; class ids run past CLASS_NAMES to cover class_N"""
+    rng = np.random.default_rng(seed)
+    x1 = rng.uniform(0, width - 50, num_boxes)
+    y1 = rng.uniform(0, height - 50, num_boxes)
+    data = np.column_stack([
+        x1, y1, x1 + rng.uniform(5, 50, num_boxes), y1 + rng.uniform(5, 50, num_boxes),
+        rng.uniform(0.25, 1.0, num_boxes), rng.integers(0, num_classes, num_boxes)
+    ]).astype(np.float32)
+    return data
+
+
+def legacy_postprocess(data, class_names, img_width, img_height, selected_classes=None):
+    """The per-box loop detect() used before vectorization, over the same float32 values"""
+    detections = []
+    yolo_labels = []
+    for x1, y1, x2, y2, conf, cls in data:
+        cls = int(cls)
+        class_name = class_names[cls] if cls < len(class_names) else f"class_{cls}"
+        if selected_classes and class_name not in selected_classes:
+            continue
+        detections.append({
+            "class": class_name,
+            "confidence": float(conf),
+            "bbox": [float(x1), float(y1), float(x2), float(y2)]
+        })
+        x_center = ((x1 + x2) / 2) / img_width
+        y_center = ((y1 + y2) / 2) / img_height
+        width = (x2 - x1) / img_width
+        height = (y2 - y1) / img_height
+        yolo_labels.append(f"{cls} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}")
+    return detections, yolo_labels
+
+
+def vectorized_postprocess(data, class_names, img_width, img_height, selected_classes=None):
+    xyxy, conf, cls = data[:, :4], data[:, 4], data[:, 5].astype(np.int64)
+    return format_detections(xyxy, conf, cls, class_names, img_width, img_height,
+                             select_class_ids(class_names, selected_classes))
+
+
+def assert_labels_match(legacy, vectorized):
+    assert len(legacy) == len(vectorized)
+    for old, new in zip(legacy, vectorized):
+        old_values, new_values = old.split(), new.split()
+        assert old_values[0] == new_values[0]
+        # The legacy loop normalized in float32, the vectorized path in float64
+        assert np.allclose([float(v) for v in old_values[1:]], [float(v) for v in new_values[1:]], atol=2e-6)
+
+
+@pytest.mark.parametrize("selected", [None, ["person", "dog"], ["car", "class_5"], ["unknown"]])
+def test_matches_the_legacy_loop(selected):
+    data = random_boxes(300)
+    legacy = legacy_postprocess(data, CLASS_NAMES, 1280, 720, selected)
+    vectorized = vectorized_postprocess(data, CLASS_NAMES, 1280, 720, selected)
+    assert vectorized[0] == legacy[0]
+    assert_labels_match(legacy[1], vectorized[1])
+
+
+def test_result_arrays():
+    data = random_boxes(5)
+    xyxy, conf, cls = result_arrays(SimpleNamespace(boxes=FakeBoxes(data)))
+    assert np.array_equal(xyxy, data[:, :4]) and np.array_equal(conf, data[:, 4])
+    assert cls.dtype == np.int64 and np.array_equal(cls, data[:, 5].astype(np.int64))
+    assert all(len(array) == 0 for array in result_arrays(SimpleNamespace(boxes=None)))
+    assert all(len(array) == 0 for array in result_arrays(SimpleNamespace(boxes=FakeBoxes(data[:0]))))
+
+
+def test_empty_results():
+    assert format_detections(*empty_arrays(), CLASS_NAMES, 640, 480) == ([], [])
+    assert yolo_label_lines(np.zeros((0, 4)), np.zeros(0, dtype=np.int64), 640, 480) == []
+
+
+def test_select_class_ids():
+    assert select_class_ids(CLASS_NAMES, None) is None
+    assert select_class_ids(CLASS_NAMES, ["dog", "person", "class_7"]).tolist() == [0, 3, 7]
+    assert select_class_ids(CLASS_NAMES, ["unknown"]).tolist() == []
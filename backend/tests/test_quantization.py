@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from backends import ExportedBackend
+from quantization import agreement, evaluate, quantize_model
+
+
+def raw_output(candidates, num_classes=3):
+    """YOLOv8-style (4 + num_classes, anchors) output from (cx, cy, w, h, class, score) rows"""
+    output = np.zeros((4 + num_classes, len(candidates)), dtype=np.float32)
+    for i, (cx, cy, w, h, cls, score) in enumerate(candidates):
+        output[:4, i] = [cx, cy, w, h]
+        output[4 + cls, i] = score
+    return output
+
+
+class FakeRuntime(ExportedBackend):
+    """An exported model that always sees the same candidates; NMS suppresses the duplicate"""
+
+    def __init__(self, candidates, size_bytes):
+        super().__init__("model.onnx", imgsz=64)
+        self.candidates = candidates
+        self.size_bytes = size_bytes
+
+    def run(self, blob):
+        return np.stack([raw_output(self.candidates)] * len(blob))
+
+    def memory_bytes(self):
+        return self.size_bytes
+
+
+FLOAT_CANDIDATES = [
+    (20, 20, 10, 10, 0, 0.9),
+    (21, 20, 10, 10, 0, 0.8),  # duplicate of the first box
+    (45, 45, 12, 12, 1, 0.7)
+]
+INT8_CANDIDATES = [
+    (20.5, 20, 10, 10, 0, 0.85),
+    (21, 20.5, 10, 10, 0, 0.75),
+    (45, 45, 12, 12, 2, 0.7)  # right place, wrong class
+]
+
+
+@pytest.fixture
+def images():
+    return [np.zeros((64, 64, 3), dtype=np.uint8)] * 2
+
+
+def test_agreement_on_decoded_outputs(images):
+    reference = FakeRuntime(FLOAT_CANDIDATES, 4000).predict(images, 0.25, 0.45)
+    candidate = FakeRuntime(INT8_CANDIDATES, 1000).predict(images, 0.25, 0.45)
+    assert all(len(cls) == 2 for _, _, cls in reference)
+    assert agreement(reference, reference) == 1.0
+    assert agreement(reference, candidate) == 0.5
+    empty = [(np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=np.int64))] * 2
+    assert agreement(empty, candidate) == 1.0
+    assert agreement(reference, empty) == 0.0
+
+
+def test_evaluate_reports_speed_size_and_agreement(images):
+    report = evaluate(FakeRuntime(FLOAT_CANDIDATES, 4 * 1024 * 1024), FakeRuntime(INT8_CANDIDATES, 1024 * 1024),
+                      images, repeat=1)
+    assert report["images"] == 2
+    assert report["agreement"] == 0.5
+    assert (report["float_size_mb"], report["int8_size_mb"]) == (4.0, 1.0)
+    assert report["float_ms_per_image"] > 0 and report["speedup"] > 0
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        quantize_model("model.onnx", "fp4")
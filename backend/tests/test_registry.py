@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from registry import ModelRegistry
+
+MB = 1024 * 1024
+
+
+class FakeDetector:
+    def __init__(self, name, size_mb=10):
+        self.model_name = name
+        self.size_mb = size_mb
+        self.device = "cpu"
+        self.backend = "torch"
+        self.class_names = ["person"]
+        self.closed = False
+
+    def memory_bytes(self):
+        return self.size_mb * MB
+
+    def close(self):
+        self.closed = True
+
+
+def make_registry(max_models=3, budget_mb=1000, sizes=None, delay=0.0):
+    loads = []
+
+    def loader(name):
+        loads.append(name)
+        time.sleep(delay)
+        return FakeDetector(name, (sizes or {}).get(name, 10))
+
+    return ModelRegistry(loader, "default.pt", max_models=max_models, memory_budget_mb=budget_mb), loads
+
+
+def names(registry):
+    return [model["name"] for model in registry.resident()]
+
+
+def test_lru_eviction_keeps_the_default():
+    registry, loads = make_registry(max_models=2)
+    default = registry.default
+    a = registry.get("a.pt")
+    assert names(registry) == ["default.pt", "a.pt"]
+    b = registry.get("b.pt")
+    # "default.pt" is the least recently used but is never evicted
+    assert names(registry) == ["default.pt", "b.pt"]
+    assert a.closed and not default.closed and not b.closed
+    assert registry.get("b.pt") is b and loads == ["default.pt", "a.pt", "b.pt"]
+    assert registry.stats()["evictions"] == 1
+
+
+def test_recent_use_protects_a_model():
+    registry, _ = make_registry(max_models=3)
+    registry.default
+    a = registry.get("a.pt")
+    b = registry.get("b.pt")
+    registry.peek("a.pt")
+    registry.get("c.pt")
+    assert b.closed and not a.closed
+    assert names(registry) == ["default.pt", "a.pt", "c.pt"]
+
+
+def test_memory_budget_evicts_before_the_count_limit():
+    registry, _ = make_registry(max_models=10, budget_mb=100, sizes={"default.pt": 20, "big.pt": 60, "huge.pt": 70})
+    registry.default
+    big = registry.get("big.pt")
+    registry.get("huge.pt")
+    assert big.closed
+    assert names(registry) == ["default.pt", "huge.pt"]
+    assert registry.stats()["memory_mb"] == 90
+
+
+def test_concurrent_gets_share_one_load():
+    registry, loads = make_registry(delay=0.1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("a.pt"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == ["a.pt"]
+    assert len({id(detector) for detector in results}) == 1
+    assert registry.stats()["loading"] == []
+
+
+def test_failed_load_is_raised_to_every_waiter_and_retried():
+    attempts = []
+
+    def loader(name):
+        attempts.append(name)
+        if len(attempts) == 1:
+            # Long enough for every thread to be waiting on this load
+            time.sleep(0.2)
+            raise RuntimeError("download failed")
+        return FakeDetector(name)
+
+    registry = ModelRegistry(loader, "default.pt", max_models=3, memory_budget_mb=1000)
+    errors = []
+
+    def get():
+        try:
+            registry.get("a.pt")
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=get) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == ["download failed"] * 3
+    assert registry.get("a.pt").model_name == "a.pt"
+    assert attempts == ["a.pt", "a.pt"]
+
+
+def test_add_replaces_and_closes_the_old_detector():
+    registry, _ = make_registry()
+    old = registry.get("a.pt")
+    new = registry.add("a.pt", FakeDetector("a.pt"), make_default=True)
+    assert old.closed and not new.closed
+    assert registry.default is new
+    with pytest.raises(KeyError):
+        registry.set_default("missing.pt")
+    registry.close()
+    assert new.closed and registry.resident() == []
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from roi import RegionOfInterest, parse_roi
+
+
+def detection(box):
+    return {"class": "car", "confidence": 0.8, "bbox": list(box)}
+
+
+def test_parse_roi():
+    assert len(parse_roi("[[0, 0], [10, 0], [10, 10]]")) == 1
+    assert len(parse_roi([[[0, 0], [1, 0], [1, 1]], [[2, 2], [3, 2], [3, 3]]])) == 2
+    assert parse_roi("") is None
+    with pytest.raises(ValueError):
+        parse_roi("[[0, 0], [1, 1]]")
+
+
+def test_crop_is_the_polygon_bounding_box():
+    roi = RegionOfInterest(parse_roi([[100, 50], [300, 50], [300, 150], [100, 150]]))
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    crop = roi.crop(frame)
+    assert crop.shape[:2] == (100, 200)
+    assert np.shares_memory(crop, frame)
+
+
+def test_restore_shifts_boxes_and_drops_those_outside():
+    # Triangle: the crop box is (0, 0)-(200, 200) but its upper-right half is outside
+    roi = RegionOfInterest(parse_roi([[0, 0], [0, 200], [200, 200]]))
+    frame_shape = (400, 400, 3)
+    restored = roi.restore([detection([10, 150, 30, 170]), detection([150, 10, 170, 30])], frame_shape)
+    assert [d["bbox"] for d in restored] == [[10.0, 150.0, 30.0, 170.0]]
+
+    roi = RegionOfInterest(parse_roi([[100, 100], [300, 100], [300, 300], [100, 300]]))
+    restored = roi.restore([detection([10, 20, 30, 40])], frame_shape)
+    assert restored[0]["bbox"] == [110.0, 120.0, 130.0, 140.0]
+    assert restored[0]["class"] == "car"
+    assert roi.restore([], frame_shape) == []
+
+
+def test_normalized_polygons_scale_with_the_frame():
+    roi = RegionOfInterest(parse_roi([[0.5, 0.5], [1, 0.5], [1, 1], [0.5, 1]]))
+    assert roi.normalized
+    assert roi.crop(np.zeros((100, 200, 3), dtype=np.uint8)).shape[:2] == (50, 100)
+    restored = roi.restore([detection([0, 0, 10, 10])], (100, 200, 3))
+    assert restored[0]["bbox"] == [100.0, 50.0, 110.0, 60.0]
+
+
+def test_roi_outside_the_frame():
+    roi = RegionOfInterest(parse_roi([[500, 500], [600, 500], [600, 600]]))
+    with pytest.raises(ValueError):
+        roi.check((240, 320))
+    with pytest.raises(ValueError):
+        roi.crop(np.zeros((240, 320, 3), dtype=np.uint8))
@@ -0,0 +1,185 @@
+import time
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from roi import RegionOfInterest, parse_roi
+from streams import StreamSession, StreamSessionManager
+
+
+@pytest.fixture
+def video_file(tmp_path):
+    path = str(tmp_path / "camera.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48))
+    for i in range(50):
+        writer.write(np.full((48, 64, 3), i * 5, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+class FakeReader:
+    """Stands in for LatestFrameReader: one fresh frame per take()"""
+
+    def __init__(self, shape=(240, 320)):
+        self.frame_shape = shape
+        self.frames_dropped = 0
+        self.latest_index = 0
+        self.has_new_frame = True
+
+    def take(self):
+        self.latest_index += 1
+        return self.latest_index, np.zeros(self.frame_shape + (3,), dtype=np.uint8), 0.0
+
+    def stop(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+def make_session(name, roi=None, next_due=0.0):
+    session = StreamSession(name, f"rtsp://{name}", roi=roi)
+    session.reader = FakeReader()
+    session.next_due = next_due
+    return session
+
+
+def detect(frames, options, model_name):
+    return [[{"class": "person", "confidence": 0.9, "bbox": [1, 1, 5, 5]}] for _ in frames]
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def run_scheduled(manager, sessions):
+    """One scheduler pass, as _work runs it"""
+    manager._sessions = {session.id: session for session in sessions}
+    batch, _ = manager._next_batch()
+    try:
+        manager._run_batch(batch)
+    finally:
+        for session in batch:
+            session.in_flight = False
+    return batch
+
+
+def test_session_detects_until_stopped(video_file):
+    manager = StreamSessionManager(detect, max_sessions=2, workers=1, max_batch=2)
+    session = manager.start(video_file, detect_fps=50)
+    assert session.reader.frame_shape == (48, 64)
+    assert wait_for(lambda: session.frames_processed >= 2)
+    info = manager.list()[0]
+    assert info["session_id"] == session.id and info["total_detections"] >= 2
+    assert manager.stop(session.id) is session
+    assert session.stopped and manager.get(session.id) is None
+    manager.shutdown()
+
+
+def test_bad_url_and_session_limit(video_file):
+    manager = StreamSessionManager(detect, max_sessions=1, workers=1, max_batch=1)
+    with pytest.raises(HTTPException) as error:
+        manager.start("/does/not/exist.mp4")
+    assert error.value.status_code == 400
+    assert manager.stats()["sessions"] == 0
+
+    manager.start(video_file)
+    with pytest.raises(HTTPException) as error:
+        manager.start(video_file)
+    assert error.value.status_code == 503
+    manager.shutdown()
+    assert manager.stats()["sessions"] == 0
+
+
+def test_delivery_error_fails_only_its_session():
+    manager = StreamSessionManager(detect, max_sessions=4, workers=1, max_batch=4)
+    broken, good = make_session("broken"), make_session("good")
+
+    def deliver(*args):
+        raise RuntimeError("subscriber gone")
+
+    broken.deliver = deliver
+    run_scheduled(manager, [broken, good])
+    assert broken.error == "subscriber gone"
+    assert good.error is None and good.frames_processed == 1
+
+
+def test_model_error_fails_the_batch_but_sessions_stay_scheduled():
+    calls = []
+
+    def flaky(frames, options, model_name):
+        calls.append(len(frames))
+        if len(calls) == 1:
+            raise RuntimeError("out of memory")
+        return detect(frames, options, model_name)
+
+    manager = StreamSessionManager(flaky, max_sessions=4, workers=1, max_batch=4)
+    sessions = [make_session("a"), make_session("b")]
+    run_scheduled(manager, sessions)
+    assert all(session.error == "out of memory" for session in sessions)
+    assert not any(session.in_flight for session in sessions)
+
+    for session in sessions:
+        session.next_due = 0.0
+    run_scheduled(manager, sessions)
+    assert calls == [2, 2]
+    assert all(session.frames_processed == 1 for session in sessions)
+
+
+def test_most_overdue_sessions_go_first():
+    manager = StreamSessionManager(detect, max_sessions=4, workers=1, max_batch=1)
+    late, later, failing = (make_session("late", next_due=5.0), make_session("later", next_due=1.0),
+                            make_session("failing", next_due=0.0))
+
+    def deliver(*args):
+        raise RuntimeError("subscriber gone")
+
+    failing.deliver = deliver
+    order = [run_scheduled(manager, [late, later, failing])[0].id for _ in range(3)]
+    # A failing session takes its turn like any other and does not starve the rest
+    assert order == ["failing", "later", "late"]
+    assert later.frames_processed == 1 and late.frames_processed == 1
+
+
+def test_bad_roi_fails_only_its_session():
+    manager = StreamSessionManager(detect, max_sessions=4, workers=1, max_batch=4)
+    outside = RegionOfInterest(parse_roi([[500, 500], [600, 500], [600, 600]]))
+    bad, good = make_session("bad", roi=outside), make_session("good")
+    run_scheduled(manager, [bad, good])
+    assert bad.error is not None and "roi" in bad.error
+    assert bad.frames_processed == 0
+    assert good.error is None and good.frames_processed == 1
+    assert manager.frames == 1
+
+
+def test_set_roi_rejects_a_region_outside_the_stream():
+    session = make_session("s")
+    with pytest.raises(HTTPException) as error:
+        session.set_roi(RegionOfInterest(parse_roi([[500, 500], [600, 500], [600, 600]])))
+    assert error.value.status_code == 400
+    session.set_roi(RegionOfInterest(parse_roi([[0, 0], [100, 0], [100, 100]])))
+    assert session.roi is not None
+
+
+def test_roi_sessions_get_cropped_frames_and_frame_coordinates():
+    shapes = []
+
+    def detect_on_crop(frames, options, model_name):
+        shapes.append([frame.shape[:2] for frame in frames])
+        return detect(frames, options, model_name)
+
+    manager = StreamSessionManager(detect_on_crop, max_sessions=4, workers=1, max_batch=4)
+    roi = RegionOfInterest(parse_roi([[100, 50], [300, 50], [300, 150], [100, 150]]))
+    cropped, full = make_session("cropped", roi=roi), make_session("full")
+    run_scheduled(manager, [cropped, full])
+    # Both share one batch, each with its own input
+    assert shapes == [[(100, 200), (240, 320)]]
+    assert cropped.last_result["detections"][0]["bbox"] == [101.0, 51.0, 105.0, 55.0]
+    assert full.last_result["detections"][0]["bbox"] == [1, 1, 5, 5]
@@ -0,0 +1,64 @@
+import numpy as np
+
+from tiling import TiledInference, merge_nms, tile_windows
+
+
+def test_small_image_is_one_window():
+    assert tile_windows(320, 240, 640, 0.2) == [(0, 0, 320, 240)]
+
+
+def test_windows_cover_the_image_with_full_size_tiles():
+    windows = tile_windows(1500, 1000, 640, 0.25)
+    covered = np.zeros((1000, 1500), dtype=bool)
+    for x1, y1, x2, y2 in windows:
+        assert (x2 - x1, y2 - y1) == (640, 640)
+        covered[y1:y2, x1:x2] = True
+    assert covered.all()
+    # The last row and column end at the border
+    assert max(x2 for _, _, x2, _ in windows) == 1500
+    assert max(y2 for _, _, _, y2 in windows) == 1000
+
+
+def test_merge_nms_suppresses_cut_off_duplicates_per_class():
+    xyxy = np.array([
+        [0, 0, 100, 100],    # whole object
+        [50, 0, 100, 100],   # the half a neighbouring tile saw
+        [0, 0, 100, 100],    # same place, other class
+        [300, 300, 350, 350]
+    ], dtype=np.float32)
+    conf = np.array([0.9, 0.8, 0.7, 0.6], dtype=np.float32)
+    cls = np.array([0, 0, 1, 0], dtype=np.int64)
+    kept_xyxy, kept_conf, kept_cls = merge_nms(xyxy, conf, cls, 0.5)
+    assert np.allclose(kept_conf, [0.9, 0.7, 0.6])
+    assert kept_cls.tolist() == [0, 1, 0]
+    assert kept_xyxy[0].tolist() == [0, 0, 100, 100]
+
+
+def test_merge_nms_empty():
+    xyxy, conf, cls = merge_nms(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32),
+                                np.zeros(0, dtype=np.int64), 0.5)
+    assert len(xyxy) == len(conf) == len(cls) == 0
+
+
+def test_tiled_inference_maps_tile_boxes_back_to_the_image():
+    image = np.zeros((1000, 1500, 3), dtype=np.uint8)
+    batch_sizes = []
+
+    def infer(tiles):
+        batch_sizes.append(len(tiles))
+        # One box in the top-left corner of every tile
+        return [(np.array([[10, 10, 30, 30]], dtype=np.float32), np.array([0.8], dtype=np.float32),
+                 np.array([0], dtype=np.int64)) for _ in tiles]
+
+    def infer_full(images):
+        return [(np.array([[0, 0, 1500, 1000]], dtype=np.float32), np.array([0.9], dtype=np.float32),
+                 np.array([1], dtype=np.int64))]
+
+    tiler = TiledInference(tile_size=640, overlap=0.25, max_batch=4)
+    xyxy, conf, cls = tiler.run(image, infer, infer_full)
+    windows = tile_windows(1500, 1000, 640, 0.25)
+    assert sum(batch_sizes) == len(windows) and max(batch_sizes) <= 4
+    corners = sorted(box[:2] for box, c in zip(xyxy.tolist(), cls.tolist()) if c == 0)
+    assert corners == sorted([x1 + 10, y1 + 10] for x1, y1, _, _ in windows)
+    assert cls.tolist().count(1) == 1
+    assert tiler.stats()["tiles"] == len(windows) and tiler.stats()["full_image_pass"]
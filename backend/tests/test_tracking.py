@@ -0,0 +1,52 @@
+import numpy as np
+
+from tracking import IoUTracker, iou_matrix
+
+
+def detection(box, label="person"):
+    return {"class": label, "confidence": 0.9, "bbox": list(box)}
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float64)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float64)
+    assert np.allclose(iou_matrix(a, b), [[1.0, 50 / 150, 0.0]])
+    assert iou_matrix(a, np.zeros((0, 4))).shape == (1, 0)
+
+
+def test_ids_stay_with_moving_objects():
+    tracker = IoUTracker()
+    first = tracker.update([detection([0, 0, 10, 10]), detection([100, 100, 120, 120])])
+    ids = [d["track_id"] for d in first]
+    assert ids == [1, 2]
+    # Reported in the other order and shifted a little: the ids follow the boxes
+    second = tracker.update([detection([102, 101, 122, 121]), detection([2, 1, 12, 11])])
+    assert [d["track_id"] for d in second] == [2, 1]
+    assert tracker.stats()["total_tracks"] == 2
+
+
+def test_class_change_starts_a_new_track():
+    tracker = IoUTracker()
+    tracker.update([detection([0, 0, 10, 10], "person")])
+    output = tracker.update([detection([0, 0, 10, 10], "dog")])
+    assert output[0]["track_id"] == 2
+
+
+def test_predict_moves_along_velocity_and_keeps_ids():
+    tracker = IoUTracker(velocity_smoothing=1.0)
+    tracker.update([detection([0, 0, 10, 10])])
+    tracker.update([detection([2, 0, 12, 10])])
+    predicted = tracker.predict()
+    assert predicted[0]["track_id"] == 1 and predicted[0]["interpolated"]
+    assert np.allclose(predicted[0]["bbox"], [4, 0, 14, 10])
+    # The next real detection continues the same track
+    assert tracker.update([detection([6, 0, 16, 10])])[0]["track_id"] == 1
+
+
+def test_missed_tracks_expire():
+    tracker = IoUTracker(max_missed=1)
+    tracker.update([detection([0, 0, 10, 10])])
+    tracker.update([])
+    assert tracker.stats()["active_tracks"] == 1
+    tracker.update([])
+    assert tracker.stats()["active_tracks"] == 0
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from video import FrameSampler
+
+
+class FakeCapture:
+    """Frames whose pixels all equal scene[i]; counts decodes and decode-free grabs"""
+
+    def __init__(self, scenes):
+        self.scenes = scenes
+        self.position = 0
+        self.reads = 0
+        self.grabs = 0
+
+    def grab(self):
+        if self.position >= len(self.scenes):
+            return False
+        self.position += 1
+        self.grabs += 1
+        return True
+
+    def read(self):
+        if self.position >= len(self.scenes):
+            return False, None
+        frame = np.full((36, 64, 3), self.scenes[self.position], dtype=np.uint8)
+        self.position += 1
+        self.reads += 1
+        return True, frame
+
+
+def indices(sampler, cap, **kwargs):
+    return [index for index, _ in sampler.frames(cap, **kwargs)]
+
+
+def test_all_keeps_the_first_max_frames():
+    sampler = FrameSampler(max_frames=4, total_frames=10)
+    assert sampler.source_limit == 4
+    assert indices(sampler, FakeCapture([0] * 10)) == [0, 1, 2, 3]
+
+
+def test_stride_skips_without_decoding():
+    cap = FakeCapture([0] * 10)
+    sampler = FrameSampler("stride", stride=3, total_frames=10)
+    assert indices(sampler, cap) == [0, 3, 6, 9]
+    assert (cap.reads, cap.grabs) == (4, 6)
+    assert sampler.stats()["skipped_without_decode"] == 6
+    assert sampler.output_fps == 10.0
+
+
+def test_fps_mode_uses_fractional_source_rates():
+    sampler = FrameSampler("fps", source_fps=29.97, target_fps=10)
+    assert sampler.step == 3
+    assert sampler.output_fps == pytest.approx(9.99)
+    assert indices(sampler, FakeCapture([0] * 7)) == [0, 3, 6]
+    with pytest.raises(ValueError):
+        FrameSampler("fps", source_fps=30)
+
+
+def test_unknown_source_fps_falls_back_to_a_default():
+    assert FrameSampler(source_fps=0).source_fps == 30.0
+
+
+def test_keyframes_keep_scene_changes():
+    scenes = [0, 0, 200, 200, 200, 10, 10, 10]
+    sampler = FrameSampler("keyframes", stride=1, scene_threshold=0.3)
+    assert indices(sampler, FakeCapture(scenes)) == [0, 2, 5]
+    assert sampler.stats()["decoded"] == len(scenes)
+
+
+def test_max_frames_counts_analyzed_frames_and_stop_is_honoured():
+    sampler = FrameSampler("stride", stride=2, max_frames=2)
+    assert indices(sampler, FakeCapture([0] * 10)) == [0, 2]
+    sampler = FrameSampler()
+    assert indices(sampler, FakeCapture([0] * 10), should_stop=lambda: sampler.selected >= 3) == [0, 1, 2]
+    with pytest.raises(ValueError):
+        FrameSampler("bogus")
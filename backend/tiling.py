@@ -0,0 +1,97 @@
+import numpy as np
+
+from postprocess import empty_arrays
+
+
+def tile_windows(width, height, tile_size, overlap):
+    """(x1, y1, x2, y2) windows of tile_size covering the image, neighbours sharing overlap (0-1) of a tile
+
+    The last row and column are shifted back to end at the image border, so
+    every tile is full size and no strip of the image is left out.
+    """
+    step = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        return positions + [length - tile_size]
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height) for x in starts(width)
+    ]
+
+
+def merge_nms(xyxy, conf, cls, threshold):
+    """Greedy per-class suppression by intersection over the smaller box
+
+    IoU undercounts the overlap between a whole object and the part of it a
+    neighbouring tile cut off; intersection over the smaller box catches both.
+    """
+    order = np.argsort(-conf, kind="stable")
+    areas = (xyxy[:, 2:] - xyxy[:, :2]).prod(axis=1)
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        tl = np.maximum(xyxy[i, :2], xyxy[rest, :2])
+        br = np.minimum(xyxy[i, 2:], xyxy[rest, 2:])
+        inter = np.clip(br - tl, 0, None).prod(axis=1)
+        overlap = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+        order = rest[(overlap < threshold) | (cls[rest] != cls[i])]
+    keep = np.array(keep, dtype=np.int64)
+    return xyxy[keep], conf[keep], cls[keep]
+
+
+class TiledInference:
+    """Slices a large image into overlapping tiles and merges their detections
+
+    Tiles are views into the decoded image and go through infer_fn(tiles) at
+    most max_batch at a time, so only one batch of preprocessed tiles exists
+    at once however large the image is. A downscaled pass over the whole
+    image (include_full) keeps objects larger than a tile.
+    """
+
+    def __init__(self, tile_size=640, overlap=0.2, merge_threshold=0.5, max_batch=8, include_full=True):
+        if not 0 <= overlap < 1:
+            raise ValueError("tile_overlap must be between 0 and 1")
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.merge_threshold = merge_threshold
+        self.max_batch = max(1, max_batch)
+        self.include_full = include_full
+        self.tiles = 0
+
+    def run(self, image, infer_fn, infer_full_fn=None):
+        """(xyxy, conf, cls) for the whole image in image pixels"""
+        height, width = image.shape[:2]
+        windows = tile_windows(width, height, self.tile_size, self.overlap)
+        self.tiles = len(windows)
+        parts = []
+        for start in range(0, len(windows), self.max_batch):
+            chunk = windows[start:start + self.max_batch]
+            results = infer_fn([image[y1:y2, x1:x2] for x1, y1, x2, y2 in chunk])
+            for (x1, y1, _, _), (xyxy, conf, cls) in zip(chunk, results):
+                if len(cls):
+                    # Back to full-image coordinates
+                    parts.append((xyxy + np.array([x1, y1, x1, y1], dtype=xyxy.dtype), conf, cls))
+        if self.include_full and infer_full_fn is not None and len(windows) > 1:
+            parts.append(infer_full_fn([image])[0])
+
+        parts = [part for part in parts if len(part[2])]
+        if not parts:
+            return empty_arrays()
+        xyxy = np.concatenate([part[0] for part in parts]).astype(np.float32)
+        conf = np.concatenate([part[1] for part in parts]).astype(np.float32)
+        cls = np.concatenate([part[2] for part in parts]).astype(np.int64)
+        return merge_nms(xyxy, conf, cls, self.merge_threshold)
+
+    def stats(self):
+        return {
+            "tile_size": self.tile_size,
+            "tile_overlap": self.overlap,
+            "tiles": self.tiles,
+            "full_image_pass": self.include_full and self.tiles > 1
+        }
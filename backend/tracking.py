@@ -0,0 +1,122 @@
+import numpy as np
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between two (N, 4) and (M, 4) xyxy arrays"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)))
+    tl = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    br = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (boxes_a[:, 2:] - boxes_a[:, :2]).prod(axis=1)
+    area_b = (boxes_b[:, 2:] - boxes_b[:, :2]).prod(axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+class Track:
+    def __init__(self, track_id, detection):
+        self.id = track_id
+        self.cls = detection["class"]
+        self.confidence = detection["confidence"]
+        self.box = np.array(detection["bbox"], dtype=np.float64)
+        self.velocity = np.zeros(4)
+        self.last_detected_box = self.box.copy()
+        self.frames_since_detection = 0
+        self.missed = 0
+
+    def to_detection(self, interpolated):
+        return {
+            "class": self.cls,
+            "confidence": self.confidence,
+            "bbox": self.box.tolist(),
+            "track_id": self.id,
+            "interpolated": interpolated
+        }
+
+
+class IoUTracker:
+    """Greedy IoU association with constant-velocity motion between detector runs
+
+    update() is fed real detections and assigns stable track ids; predict()
+    moves every track along its estimated velocity for frames where the
+    model was not run.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=2, velocity_smoothing=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.velocity_smoothing = velocity_smoothing
+        self.tracks = []
+        self.next_id = 1
+        self.total_tracks = 0
+
+    def predict(self):
+        """Advance all tracks by one frame and return their interpolated detections"""
+        for track in self.tracks:
+            track.box = track.box + track.velocity
+            track.frames_since_detection += 1
+        return [track.to_detection(True) for track in self.tracks]
+
+    def update(self, detections):
+        """Associate a frame's detections with existing tracks and return them with track ids"""
+        # Predicted position of each track at this frame
+        predicted = np.array([t.box + t.velocity for t in self.tracks]).reshape(-1, 4)
+        boxes = np.array([d["bbox"] for d in detections], dtype=np.float64).reshape(-1, 4)
+        ious = iou_matrix(predicted, boxes)
+
+        # Only boxes of the same class may continue a track
+        for i, track in enumerate(self.tracks):
+            for j, detection in enumerate(detections):
+                if detection["class"] != track.cls:
+                    ious[i, j] = 0.0
+
+        matched_tracks = set()
+        matched_detections = {}
+        if ious.size:
+            order = np.dstack(np.unravel_index(np.argsort(-ious, axis=None), ious.shape))[0]
+            for i, j in order:
+                if ious[i, j] < self.iou_threshold:
+                    break
+                if i in matched_tracks or j in matched_detections:
+                    continue
+                matched_tracks.add(i)
+                matched_detections[j] = self.tracks[i]
+
+        survivors = []
+        for i, track in enumerate(self.tracks):
+            if i in matched_tracks:
+                survivors.append(track)
+                continue
+            track.missed += 1
+            if track.missed <= self.max_missed:
+                # Coast along the motion estimate until it is matched again
+                track.box = predicted[i]
+                track.frames_since_detection += 1
+                survivors.append(track)
+
+        output = []
+        for j, detection in enumerate(detections):
+            track = matched_detections.get(j)
+            if track is None:
+                track = Track(self.next_id, detection)
+                self.next_id += 1
+                self.total_tracks += 1
+                survivors.append(track)
+            else:
+                box = boxes[j]
+                elapsed = track.frames_since_detection + 1
+                measured = (box - track.last_detected_box) / elapsed
+                alpha = self.velocity_smoothing
+                track.velocity = alpha * measured + (1 - alpha) * track.velocity
+                track.box = box.copy()
+                track.last_detected_box = box.copy()
+                track.confidence = detection["confidence"]
+                track.frames_since_detection = 0
+                track.missed = 0
+            output.append({**detection, "track_id": track.id, "interpolated": False})
+
+        self.tracks = survivors
+        return output
+
+    def stats(self):
+        return {"active_tracks": len(self.tracks), "total_tracks": self.total_tracks}
@@ -0,0 +1,259 @@
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+# Marks the end of the frame stream between stages
+_END = object()
+
+
+class StageStats:
+    """Busy time and throughput of one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_time = 0.0
+        self.wait_time = 0.0
+
+    def to_dict(self, wall_time):
+        return {
+            "frames": self.items,
+            "busy_seconds": round(self.busy_time, 4),
+            "waiting_seconds": round(self.wait_time, 4),
+            "fps": self.items / self.busy_time if self.busy_time > 0 else 0.0,
+            "utilization": self.busy_time / wall_time if wall_time > 0 else 0.0
+        }
+
+
+class FrameSampler:
+    """Chooses which source frames get analyzed; skipped frames are only grabbed, never decoded
+
+    Modes: "all" (contiguous), "stride" (every Nth frame), "fps" (a target
+    analysis rate) and "keyframes" (probe every Nth frame and keep those
+    whose content differs from the last kept frame by scene_threshold).
+    """
+
+    MODES = ("all", "stride", "fps", "keyframes")
+
+    def __init__(self, mode="all", source_fps=30.0, stride=1, target_fps=None, scene_threshold=0.3,
+                 max_frames=None, total_frames=None):
+        if mode not in self.MODES:
+            raise ValueError(f"sampling must be one of: {', '.join(self.MODES)}")
+        self.mode = mode
+        self.source_fps = source_fps or 30.0
+        self.scene_threshold = scene_threshold
+        self.max_frames = max_frames if max_frames and max_frames > 0 else None
+        self.total_frames = total_frames if total_frames and total_frames > 0 else None
+
+        if mode == "fps":
+            if not target_fps or target_fps <= 0:
+                raise ValueError("target_fps must be positive for fps sampling")
+            self.step = max(1, int(round(self.source_fps / target_fps)))
+        elif mode in ("stride", "keyframes"):
+            self.step = max(1, int(stride))
+        else:
+            self.step = 1
+
+        self.grabbed = 0
+        self.decoded = 0
+        self.selected = 0
+        self.last_source_index = -1
+
+    @property
+    def output_fps(self):
+        """Frame rate for an output video made of the analyzed frames only"""
+        return max(1.0, self.source_fps / self.step)
+
+    @property
+    def source_limit(self):
+        """Number of source frames this sampler stops at, when known"""
+        if self.mode == "all" and self.max_frames:
+            limit = self.max_frames
+            return min(limit, self.total_frames) if self.total_frames else limit
+        return self.total_frames
+
+    @staticmethod
+    def _signature(frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (64, 36), interpolation=cv2.INTER_AREA)
+
+    def frames(self, cap, should_stop=None):
+        """Yield (source_index, frame) for each frame selected for analysis"""
+        reference = None
+        index = -1
+        limit = self.source_limit
+        while self.max_frames is None or self.selected < self.max_frames:
+            if should_stop and should_stop():
+                return
+            index += 1
+            if limit is not None and index >= limit:
+                return
+            self.last_source_index = index
+
+            if index % self.step:
+                # Skip without decoding
+                if not cap.grab():
+                    return
+                self.grabbed += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                return
+            self.decoded += 1
+
+            if self.mode == "keyframes":
+                signature = self._signature(frame)
+                if reference is not None:
+                    change = cv2.absdiff(signature, reference).mean() / 255.0
+                    if change < self.scene_threshold:
+                        continue
+                reference = signature
+
+            self.selected += 1
+            yield index, frame
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "step": self.step,
+            "source_frames_seen": self.last_source_index + 1,
+            "skipped_without_decode": self.grabbed,
+            "decoded": self.decoded,
+            "analyzed": self.selected
+        }
+
+
+class VideoPipeline:
+    """Decode -> infer -> annotate/encode with bounded queues between the stages
+
+    The decoder and encoder run on their own threads so OpenCV's video I/O
+    overlaps with the forward passes, which run on the calling thread.
+    """
+
+    def __init__(self, cap, writer, detect_fn, draw_fn, sampler, frame_size, queue_size=None):
+        self.cap = cap
+        self.writer = writer
+        self.detect_fn = detect_fn
+        self.draw_fn = draw_fn
+        self.sampler = sampler
+        self.frame_size = frame_size
+        self.queue_size = queue_size or int(os.getenv("VIDEO_QUEUE_SIZE", 8))
+        self.stages = {name: StageStats(name) for name in ("decode", "infer", "encode")}
+        self.wall_time = 0.0
+        self._stop = threading.Event()
+        self._errors = []
+
+    def _put(self, q, item, stats):
+        start = time.time()
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                stats.wait_time += time.time() - start
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q, stats):
+        start = time.time()
+        while not self._stop.is_set():
+            try:
+                item = q.get(timeout=0.1)
+                stats.wait_time += time.time() - start
+                return item
+            except queue.Empty:
+                continue
+        return _END
+
+    def _decode(self, out_queue):
+        stats = self.stages["decode"]
+        try:
+            frames = self.sampler.frames(self.cap, should_stop=self._stop.is_set)
+            while True:
+                start = time.time()
+                item = next(frames, None)
+                stats.busy_time += time.time() - start
+                if item is None:
+                    break
+                stats.items += 1
+                if not self._put(out_queue, item, stats):
+                    return
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(out_queue, _END, stats)
+
+    def _encode(self, in_queue):
+        stats = self.stages["encode"]
+        width, height = self.frame_size
+        try:
+            while True:
+                item = self._get(in_queue, stats)
+                if item is _END:
+                    break
+                index, frame, detections = item
+                start = time.time()
+                annotated_frame = self.draw_fn(frame, detections)
+                # Ensure frame is properly formatted
+                if annotated_frame.shape[:2] != (height, width):
+                    annotated_frame = cv2.resize(annotated_frame, (width, height))
+                self.writer.write(annotated_frame)
+                stats.busy_time += time.time() - start
+                stats.items += 1
+        except Exception as e:
+            self._fail(e)
+
+    def _fail(self, error):
+        self._errors.append(error)
+        self._stop.set()
+
+    def run(self, on_frame=None, check_cancelled=None):
+        """Process the video; on_frame(source_index, detections) is called from the inference stage in order"""
+        decoded = queue.Queue(maxsize=self.queue_size)
+        to_encode = queue.Queue(maxsize=self.queue_size)
+        decoder = threading.Thread(target=self._decode, args=(decoded,), name="video-decode", daemon=True)
+        encoder = threading.Thread(target=self._encode, args=(to_encode,), name="video-encode", daemon=True)
+
+        stats = self.stages["infer"]
+        started = time.time()
+        decoder.start()
+        encoder.start()
+        try:
+            while True:
+                if check_cancelled:
+                    check_cancelled()
+                item = self._get(decoded, stats)
+                if item is _END:
+                    break
+                index, frame = item
+                start = time.time()
+                detections = self.detect_fn(index, frame)
+                stats.busy_time += time.time() - start
+                stats.items += 1
+                if on_frame:
+                    on_frame(index, detections)
+                if not self._put(to_encode, (index, frame, detections), stats):
+                    break
+        except Exception:
+            self._stop.set()
+            raise
+        finally:
+            self._put(to_encode, _END, stats)
+            decoder.join()
+            encoder.join()
+            self.wall_time = time.time() - started
+
+        if self._errors:
+            raise self._errors[0]
+
+    def stats(self):
+        report = {name: stage.to_dict(self.wall_time) for name, stage in self.stages.items()}
+        busiest = max(self.stages.values(), key=lambda stage: stage.busy_time)
+        report["sampling"] = self.sampler.stats()
+        report["wall_seconds"] = round(self.wall_time, 4)
+        report["bottleneck"] = busiest.name if busiest.busy_time > 0 else None
+        return report
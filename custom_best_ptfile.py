@@ -28,7 +28,7 @@ except ImportError:
 class VideoThread(QThread):
     update_frame = pyqtSignal(np.ndarray)
     
-    def __init__(self, source, model_path=None, arch_path=None, custom_classes=None, selected_classes=None, conf_threshold=0.5, iou_threshold=0.45, device="cpu"):
+    def __init__(self, source, model_path=None, arch_path=None, custom_classes=None, selected_classes=None, conf_threshold=0.5, iou_threshold=0.45, device="cpu", roi_polygons=None):
         super().__init__()
         self.source = source
         self.model = None
@@ -39,6 +39,11 @@ class VideoThread(QThread):
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
         self.device = device
+        # Region of interest for fixed cameras: polygons of [x, y] points (pixels, or 0-1 fractions of the frame)
+        self.roi_polygons = None
+        self.roi_offset = (0, 0)
+        self.frame_size = (0, 0)
+        self.set_roi(roi_polygons)
         self.running = False
         self.recording = False
         self.frames = []
@@ -57,6 +62,25 @@ class VideoThread(QThread):
         if model_path and os.path.exists(model_path) and TORCH_AVAILABLE:
             self.load_model(model_path, arch_path, device)
         
+    def set_roi(self, polygons):
+        """Set (or clear with None) the polygons detection is restricted to"""
+        if polygons and not isinstance(polygons[0][0], (list, tuple)):
+            polygons = [polygons]  # A single polygon
+        self.roi_polygons = [np.array(polygon, dtype=np.float32) for polygon in polygons] if polygons else None
+
+    def roi_pixel_polygons(self, width, height):
+        polygons = self.roi_polygons
+        if all(polygon.max() <= 1.0 for polygon in polygons):
+            polygons = [polygon * np.array([width, height], dtype=np.float32) for polygon in polygons]
+        return polygons
+
+    def roi_contains(self, x, y):
+        """Whether a point in frame coordinates lies inside any ROI polygon"""
+        if not self.roi_polygons:
+            return True
+        return any(cv2.pointPolygonTest(polygon, (float(x), float(y)), False) >= 0
+                   for polygon in self.roi_pixel_polygons(*self.frame_size))
+
     def load_custom_model_module(self, arch_path):
         """Load the custom model architecture from Python file"""
         try:
@@ -235,11 +259,24 @@ class VideoThread(QThread):
     def process_frame(self, frame):
         """Process frame with AI model and draw detections"""
         height, width = frame.shape[:2]
+        self.frame_size = (width, height)
+        
+        # With an ROI only its bounding box goes to the model; region is a view, so boxes drawn on it land on the frame
+        region = frame
+        self.roi_offset = (0, 0)
+        if self.roi_polygons:
+            polygons = self.roi_pixel_polygons(width, height)
+            x, y, w, h = cv2.boundingRect(np.concatenate(polygons).astype(np.int32))
+            x1, y1 = max(x, 0), max(y, 0)
+            x2, y2 = min(x + w, width), min(y + h, height)
+            if x2 > x1 and y2 > y1:
+                region = frame[y1:y2, x1:x2]
+                self.roi_offset = (x1, y1)
         
         if self.model and TORCH_AVAILABLE:
             try:
                 # Convert frame to tensor format
-                img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                img = cv2.cvtColor(region, cv2.COLOR_BGR2RGB)
                 # Prepare input tensor based on model's expected format
                 input_tensor = self.prepare_input(img)
                 
@@ -252,7 +289,7 @@ class VideoThread(QThread):
                         outputs = self.model(input_tensor)
                 
                 # Process outputs and draw detections
-                frame = self.draw_detections(frame, outputs)
+                self.draw_detections(region, outputs)
                 
             except Exception as e:
                 # If model inference fails, fall back to demo mode
@@ -268,6 +305,10 @@ class VideoThread(QThread):
             cv2.putText(frame, f"Demo Object (Conf: {self.conf_threshold:.2f}, IoU: {self.iou_threshold:.2f})", 
                         (100, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
             
+        # Outline the ROI only after inference, since region shares its pixels with frame
+        if self.roi_polygons:
+            cv2.polylines(frame, [polygon.astype(np.int32) for polygon in polygons], True, (255, 191, 0), 2)
+            
         # Add device info
         cv2.putText(frame, f"Device: {self.device}", 
                     (width - 200, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
@@ -408,6 +449,11 @@ class VideoThread(QThread):
             # Filter by selected classes if specified
             if self.selected_classes and class_name not in self.selected_classes:
                 return
+            
+            # Discard detections whose center is outside the ROI polygons
+            offset_x, offset_y = self.roi_offset
+            if not self.roi_contains((x1 + x2) / 2 + offset_x, (y1 + y2) / 2 + offset_y):
+                return
                 
             # Draw bounding box
             color = (0, 255, 0)  # Green box
@@ -271,7 +271,11 @@ const HomePage = ({ apiHealth }) => {
             options,
             (progress) => {
               setUploadProgress(progress);
-              setProcessingStatus(`Processing video... ${progress}%`);
+              setProcessingStatus(`Uploading video... ${progress}%`);
+            },
+            (status) => {
+              setUploadProgress(status.progress || 0);
+              setProcessingStatus(status.message || "Processing video...");
             },
           );
         } else {
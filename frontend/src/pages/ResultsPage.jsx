@@ -151,8 +151,16 @@ const ResultsPage = () => {
   const handleDownload = async (type = "image") => {
     try {
       if (isBatch) {
-        // For batch results, create a zip download or show individual downloads
-        toast.info("Use individual download buttons for each result");
+        // Batch outputs come as one ZIP streamed by the backend
+        if (!results?.batch_id) {
+          toast.info("Use individual download buttons for each result");
+          return;
+        }
+        uiUtils.downloadFile(
+          apiService.getBatchDownloadUrl(results.batch_id),
+          `batch_results_${Date.now()}.zip`,
+        );
+        toast.success("Download started");
         return;
       }
 
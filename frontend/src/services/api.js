@@ -135,6 +135,13 @@ export const apiService = {
     formData.append("file", file);
     formData.append("conf_threshold", options.confThreshold || 0.5);
     formData.append("iou_threshold", options.iouThreshold || 0.45);
+    if (options.modelName) formData.append("model_name", options.modelName);
+    if (options.imgsz) formData.append("imgsz", options.imgsz);
+    if (options.tiled) {
+      formData.append("tiled", true);
+      if (options.tileSize) formData.append("tile_size", options.tileSize);
+      if (options.tileOverlap != null) formData.append("tile_overlap", options.tileOverlap);
+    }
 
     if (options.selectedClasses && options.selectedClasses.length > 0) {
       formData.append(
@@ -159,6 +166,8 @@ export const apiService = {
     formData.append("file", file);
     formData.append("conf_threshold", options.confThreshold || 0.5);
     formData.append("iou_threshold", options.iouThreshold || 0.45);
+    if (options.modelName) formData.append("model_name", options.modelName);
+    if (options.imgsz) formData.append("imgsz", options.imgsz);
     formData.append("max_frames", options.maxFrames || 30);
 
     if (options.selectedClasses && options.selectedClasses.length > 0) {
@@ -205,6 +214,11 @@ export const apiService = {
     return `${API_BASE_URL}${apiEndpoints.outputs(filename)}`;
   },
 
+  // Get URL of a streamed archive of every output in a batch
+  getBatchDownloadUrl(batchId, format = "zip") {
+    return `${API_BASE_URL}/batch_download/${batchId}?format=${format}`;
+  },
+
   // Get base URL
   getBaseUrl() {
     return API_BASE_URL;
@@ -216,6 +230,8 @@ export const apiService = {
     formData.append("file", file);
     formData.append("conf_threshold", options.confThreshold || 0.5);
     formData.append("iou_threshold", options.iouThreshold || 0.45);
+    if (options.modelName) formData.append("model_name", options.modelName);
+    if (options.imgsz) formData.append("imgsz", options.imgsz);
 
     if (options.selectedClasses && options.selectedClasses.length > 0) {
       formData.append(
@@ -242,13 +258,16 @@ export const apiService = {
     return response.data;
   },
 
-  // Video upload with progress
-  async predictVideoWithProgress(file, options = {}, onProgress) {
+  // Video upload with progress; processing runs as a background job polled until it finishes
+  async predictVideoWithProgress(file, options = {}, onProgress, onStatus) {
     const formData = new FormData();
     formData.append("file", file);
     formData.append("conf_threshold", options.confThreshold || 0.5);
     formData.append("iou_threshold", options.iouThreshold || 0.45);
+    if (options.modelName) formData.append("model_name", options.modelName);
+    if (options.imgsz) formData.append("imgsz", options.imgsz);
     formData.append("max_frames", options.maxFrames || 30);
+    formData.append("background", true);
 
     if (options.selectedClasses && options.selectedClasses.length > 0) {
       formData.append(
@@ -272,6 +291,29 @@ export const apiService = {
       },
     });
 
+    return this.waitForJob(response.data.job_id, onStatus);
+  },
+
+  // Poll a background job until it completes and return its result
+  async waitForJob(jobId, onStatus, intervalMs = 1000) {
+    for (;;) {
+      const status = await this.getProcessingStatus(`status/${jobId}`);
+      if (onStatus) {
+        onStatus(status);
+      }
+      if (status.status === "completed") {
+        return status.result;
+      }
+      if (status.status === "error" || status.status === "cancelled") {
+        throw new Error(status.message);
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+  },
+
+  // Cancel a background job
+  async cancelJob(jobId) {
+    const response = await api.delete(`/jobs/${jobId}`);
     return response.data;
   },
 
@@ -285,6 +327,8 @@ export const apiService = {
 
     formData.append("conf_threshold", options.confThreshold || 0.5);
     formData.append("iou_threshold", options.iouThreshold || 0.45);
+    if (options.modelName) formData.append("model_name", options.modelName);
+    if (options.imgsz) formData.append("imgsz", options.imgsz);
 
     if (options.selectedClasses && options.selectedClasses.length > 0) {
       formData.append(
@@ -331,6 +375,8 @@ export const apiService = {
     formData.append("stream_url", streamUrl);
     formData.append("conf_threshold", options.confThreshold || 0.5);
     formData.append("iou_threshold", options.iouThreshold || 0.45);
+    if (options.modelName) formData.append("model_name", options.modelName);
+    if (options.imgsz) formData.append("imgsz", options.imgsz);
     formData.append("max_frames", options.maxFrames || 10);
 
     const response = await api.post("/predict_stream", formData, {
@@ -342,6 +388,24 @@ export const apiService = {
 
     return response.data;
   },
+
+  // Open a WebSocket for live frame detection; send JPEG Blobs, receive one message per processed frame
+  openDetectionSocket(options = {}, onMessage) {
+    const params = new URLSearchParams();
+    if (options.confThreshold) params.append("conf_threshold", options.confThreshold);
+    if (options.iouThreshold) params.append("iou_threshold", options.iouThreshold);
+    if (options.modelName) params.append("model_name", options.modelName);
+    if (options.imgsz) params.append("imgsz", options.imgsz);
+    if (options.selectedClasses && options.selectedClasses.length > 0) {
+      params.append("selected_classes", options.selectedClasses.join(","));
+    }
+
+    const wsUrl = `${API_BASE_URL.replace(/^http/, "ws")}/ws/detect?${params}`;
+    const socket = new WebSocket(wsUrl);
+    socket.binaryType = "arraybuffer";
+    socket.onmessage = (event) => onMessage && onMessage(JSON.parse(event.data));
+    return socket;
+  },
 };
 
 // Export default